@@ -0,0 +1,28 @@
+"""Add function sample rates
+
+Revision ID: 5b1c7e2d9a41
+Revises: 346d859d226e
+Create Date: 2026-10-18 10:12:41.218305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1c7e2d9a41'
+down_revision: Union[str, None] = '346d859d226e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('functions', sa.Column('idleSampleRate', sa.Float(), nullable=False, server_default='1.0'))
+    op.add_column('functions', sa.Column('activeSampleRate', sa.Float(), nullable=False, server_default='10.0'))
+
+
+def downgrade() -> None:
+    op.drop_column('functions', 'activeSampleRate')
+    op.drop_column('functions', 'idleSampleRate')
@@ -0,0 +1,48 @@
+"""Add recording identities
+
+Revision ID: 8d3e6f0a2b57
+Revises: 5b1c7e2d9a41
+Create Date: 2026-10-18 15:36:02.584117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3e6f0a2b57'
+down_revision: Union[str, None] = '5b1c7e2d9a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('function_recordings', sa.Column('started_at', sa.DateTime(), nullable=True))
+    op.add_column('function_recordings', sa.Column('ended_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_function_recordings_started_at'), 'function_recordings', ['started_at'], unique=False)
+    op.create_index('ix_function_recordings_function_id_started_at', 'function_recordings', ['function_id', 'started_at'], unique=False)
+    op.create_table('recording_identities',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recording_id', sa.Integer(), nullable=False),
+    sa.Column('person_id', sa.Integer(), nullable=False),
+    sa.Column('first_seen', sa.Float(), nullable=False),
+    sa.Column('last_seen', sa.Float(), nullable=False),
+    sa.Column('sightings', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['person_id'], ['people.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['recording_id'], ['function_recordings.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_recording_identities_person_id'), 'recording_identities', ['person_id'], unique=False)
+    op.create_index(op.f('ix_recording_identities_recording_id'), 'recording_identities', ['recording_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_recording_identities_recording_id'), table_name='recording_identities')
+    op.drop_index(op.f('ix_recording_identities_person_id'), table_name='recording_identities')
+    op.drop_table('recording_identities')
+    op.drop_index('ix_function_recordings_function_id_started_at', table_name='function_recordings')
+    op.drop_index(op.f('ix_function_recordings_started_at'), table_name='function_recordings')
+    op.drop_column('function_recordings', 'ended_at')
+    op.drop_column('function_recordings', 'started_at')
@@ -0,0 +1,45 @@
+"""Add sightings
+
+Revision ID: c41a9e7b3f08
+Revises: 8d3e6f0a2b57
+Create Date: 2026-10-18 17:02:19.730461
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41a9e7b3f08'
+down_revision: Union[str, None] = '8d3e6f0a2b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sightings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('function_id', sa.Integer(), nullable=False),
+    sa.Column('camera', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('person_id', sa.Integer(), nullable=True),
+    sa.Column('track_id', sa.Integer(), nullable=False),
+    sa.Column('confidence', sa.Float(), nullable=False),
+    sa.Column('x1', sa.Integer(), nullable=False),
+    sa.Column('y1', sa.Integer(), nullable=False),
+    sa.Column('x2', sa.Integer(), nullable=False),
+    sa.Column('y2', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['function_id'], ['functions.id'], ),
+    sa.ForeignKeyConstraint(['person_id'], ['people.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sightings_function_id_timestamp', 'sightings', ['function_id', 'timestamp'], unique=False)
+    op.create_index('ix_sightings_person_id_timestamp', 'sightings', ['person_id', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sightings_person_id_timestamp', table_name='sightings')
+    op.drop_index('ix_sightings_function_id_timestamp', table_name='sightings')
+    op.drop_table('sightings')
@@ -0,0 +1,33 @@
+"""Strip camera credentials from sightings
+
+Revision ID: e5a0b9c2d713
+Revises: c41a9e7b3f08
+Create Date: 2026-10-18 21:14:05.182340
+
+"""
+from typing import Sequence, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a0b9c2d713'
+down_revision: Union[str, None] = 'c41a9e7b3f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows logged before camera_label() stored the full stream URL, user:password included
+    bind = op.get_bind()
+    sightings = sa.table('sightings', sa.column('camera', sa.String))
+    for (camera,) in bind.execute(sa.select(sightings.c.camera).distinct()).all():
+        parts = urlsplit(camera)
+        stripped = urlunsplit(parts._replace(netloc=parts.netloc.rpartition('@')[2]))
+        if stripped != camera:
+            bind.execute(sightings.update().where(sightings.c.camera == camera).values(camera=stripped))
+
+
+def downgrade() -> None:
+    pass  # The credentials are gone for good
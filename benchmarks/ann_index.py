@@ -0,0 +1,76 @@
+"""Recall@1 and queries/sec of the IVF index against the exact GalleryMatcher.
+
+Synthetic embeddings are drawn from a low-dimensional latent space projected to
+512-d, which mimics the clustered structure of real FaceNet embeddings (purely
+isotropic random vectors have no structure for any ANN index to exploit).
+
+Run from the repository root:
+    python benchmarks/ann_index.py
+"""
+import os, sys, time
+import numpy as np
+
+# Import the service modules directly: importing the `src` package boots the whole API
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "app", "v1", "DetectFaces", "Services"))
+from galleryMatcher import GalleryMatcher, EMBEDDING_SIZE
+from annIndex import IVFIndex
+
+IDENTITY_COUNTS = [10_000, 50_000]
+EMBEDDINGS_PER_PERSON = 3
+LATENT_SIZE = 64
+QUERIES = 500
+NPROBES = [4, 8, 16, 32, 64]
+
+
+def synthetic_gallery(identities, rng):
+    projection = rng.standard_normal((LATENT_SIZE, EMBEDDING_SIZE)).astype(np.float32)
+    centers = rng.standard_normal((identities, LATENT_SIZE)).astype(np.float32) @ projection
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    def sample(person_ids):
+        noise = rng.standard_normal((len(person_ids), EMBEDDING_SIZE)).astype(np.float32)
+        return centers[person_ids] + 0.35 * noise / np.sqrt(EMBEDDING_SIZE)
+
+    person_index = np.repeat(np.arange(identities), EMBEDDINGS_PER_PERSON)
+    matcher = GalleryMatcher(sample(person_index), person_index, [str(i) for i in range(identities)])
+    query_ids = rng.choice(identities, QUERIES, replace=False)
+    return matcher, sample(query_ids), query_ids
+
+
+def run(matcher, queries, batch=10):
+    start = time.perf_counter()
+    matches = []
+    for i in range(0, len(queries), batch):  # Frames of `batch` faces
+        matches.extend(matcher.match(queries[i:i + batch]))
+    return [key for key, _ in matches], len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for identities in IDENTITY_COUNTS:
+        matcher, queries, query_ids = synthetic_gallery(identities, rng)
+        exact, exact_qps = run(matcher, queries)
+        truth = [str(i) for i in query_ids]
+        exact_recall = np.mean([a == b for a, b in zip(exact, truth)])
+
+        start = time.perf_counter()
+        index = IVFIndex.build(matcher)
+        build_time = time.perf_counter() - start
+
+        print(f"\n{identities} identities, {len(matcher.embeddings)} embeddings, "
+              f"{len(index.centroids)} lists (build {build_time:.1f}s)")
+        print(f"{'mode':>12} {'recall@1':>9} {'vs exact':>9} {'queries/s':>10}")
+        print(f"{'exact':>12} {exact_recall:>9.3f} {1.0:>9.3f} {exact_qps:>10.0f}")
+
+        matcher.index = index
+        for nprobe in NPROBES:
+            index.nprobe = nprobe
+            approx, qps = run(matcher, queries)
+            recall = np.mean([a == b for a, b in zip(approx, truth)])
+            agreement = np.mean([a == b for a, b in zip(approx, exact)])
+            print(f"{f'nprobe={nprobe}':>12} {recall:>9.3f} {agreement:>9.3f} {qps:>10.0f}")
+        matcher.index = None
+
+
+if __name__ == "__main__":
+    main()
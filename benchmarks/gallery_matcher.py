@@ -0,0 +1,65 @@
+"""Compare the vectorized GalleryMatcher against the per-embedding scipy loop.
+
+Run from the repository root:
+    python benchmarks/gallery_matcher.py
+"""
+import os, sys, time
+import numpy as np
+from scipy.spatial.distance import cosine
+
+# Import the service module directly: importing the `src` package boots the whole API
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "app", "v1", "DetectFaces", "Services"))
+from galleryMatcher import GalleryMatcher, EMBEDDING_SIZE
+
+IDENTITY_COUNTS = [100, 1_000, 10_000]
+EMBEDDINGS_PER_PERSON = 5
+FACES_PER_FRAME = 10
+
+
+def synthetic_gallery(identities, rng):
+    return {
+        str(i): {
+            "image_url": f"/api/v1/storage-operations/uploads/{i}/profile.jpeg",
+            "embeddings": list(rng.standard_normal((EMBEDDINGS_PER_PERSON, EMBEDDING_SIZE)).astype(np.float32)),
+        }
+        for i in range(identities)
+    }
+
+
+def legacy_match(all_people_faces, img_embedding):
+    # The loop previously run for every detected face in the DetectFaces controller
+    detect_dict = {k: min([cosine(v, img_embedding) for v in data["embeddings"]])
+                   for k, data in all_people_faces.items() if data["embeddings"]}
+    min_key = min(detect_dict, key=detect_dict.get)
+    return min_key, detect_dict[min_key]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'identities':>10} {'legacy ms/frame':>16} {'matcher ms/frame':>17} {'speedup':>8}")
+
+    for identities in IDENTITY_COUNTS:
+        gallery = synthetic_gallery(identities, rng)
+        probes = rng.standard_normal((FACES_PER_FRAME, EMBEDDING_SIZE)).astype(np.float32)
+
+        build_time, matcher = timed(lambda: GalleryMatcher.from_people(gallery), 1)
+
+        # The legacy loop is too slow to run a whole frame at 10k, so time one face and scale
+        legacy_face, legacy_result = timed(lambda: legacy_match(gallery, probes[0]), 1)
+        legacy_frame = legacy_face * FACES_PER_FRAME
+        matcher_frame, matches = timed(lambda: matcher.match(probes), 20)
+
+        assert matches[0][0] == legacy_result[0], "matcher disagrees with the scipy loop"
+        print(f"{identities:>10} {legacy_frame * 1000:>16.2f} {matcher_frame * 1000:>17.2f} "
+              f"{legacy_frame / matcher_frame:>7.0f}x  (build {build_time * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Load time and memory of allFaces.pkl versus the memory-mapped gallery format.
+
+Each load runs in a fresh interpreter. RssAnon is private memory (paid again by
+every worker), RssFile is page-cache memory shared by all workers mapping the
+same gallery file. Linux only (reads /proc/self/status).
+
+Run from the repository root:
+    python benchmarks/gallery_store.py
+"""
+import os, sys, time, pickle, subprocess, tempfile
+import numpy as np
+
+os.environ.setdefault("APP_ROLE", "api")  # Importing `src` builds the app; keep it light
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+IDENTITY_COUNTS = [1_000, 10_000, 50_000]
+EMBEDDINGS_PER_PERSON = 5
+
+
+def memory_kb():
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0])
+    return fields
+
+
+def child(kind, models_dir):
+    # Imported before the first memory sample, so booting `src` is not counted as gallery memory
+    from src.app.v1.DetectFaces.Services.galleryStore import load_gallery, Gallery
+
+    before = memory_kb()
+    start = time.perf_counter()
+    if kind == "pickle":
+        with open(os.path.join(models_dir, "allFaces.pkl"), "rb") as f:
+            gallery = Gallery.from_people_faces(pickle.load(f))
+    else:
+        gallery = load_gallery(models_dir)
+    matcher = gallery.matcher()
+    matcher.match(np.ones((1, 512), dtype=np.float32))  # Touch every row once, as the first frame would
+    elapsed = time.perf_counter() - start
+    after = memory_kb()
+    print(f"{elapsed:.3f} {after['RssAnon'] - before['RssAnon']} {after['RssFile'] - before['RssFile']}")
+
+
+def main():
+    from src.app.v1.DetectFaces.Services.galleryStore import Gallery, publish_gallery
+
+    rng = np.random.default_rng(0)
+    print(f"{'identities':>10} {'format':>8} {'file MB':>8} {'load s':>7} {'private MB':>11} {'shared MB':>10}")
+    for identities in IDENTITY_COUNTS:
+        with tempfile.TemporaryDirectory() as models_dir:
+            models_dir += "/"
+            people = {
+                str(i): {"name": f"Person {i}", "image_url": f"/api/v1/storage-operations/uploads/{i}/profile.jpeg",
+                         "embeddings": list(rng.standard_normal((EMBEDDINGS_PER_PERSON, 512)).astype(np.float32))}
+                for i in range(identities)
+            }
+            with open(models_dir + "allFaces.pkl", "wb") as f:
+                pickle.dump(people, f)
+            publish_gallery(Gallery.from_people_faces(people), models_dir)
+
+            sizes = {
+                "pickle": os.path.getsize(models_dir + "allFaces.pkl"),
+                "binary": sum(os.path.getsize(models_dir + name) for name in os.listdir(models_dir) if name != "allFaces.pkl"),
+            }
+            for kind in ("pickle", "binary"):
+                output = subprocess.run([sys.executable, __file__, "--child", kind, models_dir],
+                                        capture_output=True, text=True, check=True).stdout.split()
+                elapsed, private_kb, shared_kb = float(output[0]), int(output[1]), int(output[2])
+                print(f"{identities:>10} {kind:>8} {sizes[kind] / 1e6:>8.1f} {elapsed:>7.2f} "
+                      f"{private_kb / 1024:>11.1f} {shared_kb / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
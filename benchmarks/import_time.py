@@ -0,0 +1,41 @@
+"""Boot cost of the API package per APP_ROLE.
+
+Each role imports `src` (which builds the FastAPI app and all of its routes) in a
+fresh interpreter and reports the import time, the peak RSS and which heavy
+inference modules ended up loaded. Linux only (ru_maxrss is in KB).
+
+Run from the repository root:
+    python benchmarks/import_time.py
+"""
+import os, sys, subprocess
+
+ROLES = ["api", "all", "inference"]
+HEAVY_MODULES = ["torch", "ultralytics", "facenet_pytorch", "cv2"]
+REPEATS = 3
+
+CHILD = f"""
+import sys, time, resource
+start = time.perf_counter()
+import src
+elapsed = time.perf_counter() - start
+loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, ",".join(loaded) or "-")
+"""
+
+
+def main():
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    print(f"{'role':>10} {'import s':>9} {'peak RSS MB':>12}  heavy modules loaded")
+    for role in ROLES:
+        runs = []
+        for _ in range(REPEATS):
+            output = subprocess.run([sys.executable, "-c", CHILD], cwd=root, capture_output=True, text=True,
+                                    check=True, env={**os.environ, "APP_ROLE": role}).stdout.split()
+            runs.append((float(output[0]), int(output[1]), output[2]))
+        elapsed = min(run[0] for run in runs)
+        peak_kb = min(run[1] for run in runs)
+        print(f"{role:>10} {elapsed:>9.2f} {peak_kb / 1024:>12.1f}  {runs[0][2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""CPU throughput and numerical parity of the PyTorch and ONNX Runtime backends.
+
+Detector: frames/sec at batch 1 and batch 8, and how many boxes the ONNX model
+reproduces (IoU >= 0.9 with a PyTorch box). Embedder: faces/sec at batch 1 and
+batch 64, and per-face cosine similarity against the PyTorch embeddings.
+Exports the ONNX models on first run.
+
+Uses the enrolled profile images (storage/users/*/profile.jpeg) as frames, or
+synthetic frames when there are none. Run from the repository root:
+    python benchmarks/inference_backends.py
+"""
+import os, sys, glob, time
+import numpy as np
+
+os.environ.setdefault("APP_ROLE", "api")  # Importing `src` builds the app; keep it light
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cv2
+from src.app.v1.DetectFaces.Services.faceTracker import iou_matrix
+from src.app.v1.DetectFaces.Services.faceEncoder import preprocess_face, encode_batch
+from src.app.v1.DetectFaces.Services.faceAlignment import align_faces, detection_keypoints
+from src.app.v1.DetectFaces.Services.inferenceBackends import load_detector, load_embedder, embedder_parity, embedder_onnx_path
+from src.app.v1.DetectFaces.Services.modelRegistry import DETECTOR_WEIGHTS, EMBEDDER_WEIGHTS
+
+BACKENDS = ["torch", "onnx"]
+MAX_FRAMES = 32
+SECONDS = 5  # Minimum time measured per configuration
+
+
+def load_frames():
+    paths = sorted(glob.glob(f"{os.getenv('STORAGE_DIR', './storage')}/users/*/profile.jpeg"))[:MAX_FRAMES]
+    frames = [frame for frame in (cv2.imread(path) for path in paths) if frame is not None]
+    if not frames:
+        print("No enrolled profile images found, using synthetic frames (detector parity is meaningless)")
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(8)]
+    return frames
+
+
+def throughput(run, batches, items_per_batch):
+    """Items per second of `run(batch)` cycling over `batches` for at least SECONDS"""
+    run(batches[0])  # Warm-up
+    done, start = 0, time.perf_counter()
+    while time.perf_counter() - start < SECONDS:
+        run(batches[done % len(batches)])
+        done += 1
+    return done * items_per_batch / (time.perf_counter() - start)
+
+
+def detector_boxes(detector, frames):
+    return [result.boxes.xyxy.cpu().numpy() for result in detector(frames, verbose=False)]
+
+
+def main():
+    frames = load_frames()
+    print(f"{len(frames)} frames\n")
+
+    # Detector
+    detections, faces = {}, []
+    print(f"{'detector':>10} {'frames/s b=1':>13} {'frames/s b=8':>13}")
+    for backend in BACKENDS:
+        detector = load_detector(DETECTOR_WEIGHTS, backend)
+        single = throughput(lambda frame: detector(frame, verbose=False), frames, 1)
+        batches = [frames[i:i + 8] for i in range(0, len(frames), 8) if len(frames[i:i + 8]) == 8] or [(frames * 8)[:8]]
+        batched = throughput(lambda batch: detector(batch, verbose=False), batches, 8)
+        detections[backend] = detector_boxes(detector, frames)
+        print(f"{backend:>10} {single:>13.1f} {batched:>13.1f}")
+        if backend == "torch":
+            for frame, result in zip(frames, detector(frames, verbose=False)):
+                boxes = [tuple(map(int, box)) for box in result.boxes.xyxy.cpu().numpy()]
+                faces.extend(preprocess_face(face) for face in align_faces(frame, boxes, detection_keypoints(result)))
+
+    reference_count = sum(len(boxes) for boxes in detections["torch"])
+    matched = sum(
+        int((iou_matrix(reference, candidate).max(axis=1) >= 0.9).sum())
+        for reference, candidate in zip(detections["torch"], detections["onnx"])
+        if len(reference) and len(candidate)
+    )
+    print(f"detector parity: {matched}/{reference_count} PyTorch boxes reproduced by ONNX (IoU >= 0.9)\n")
+
+    # Embedder
+    if not faces:
+        faces = [preprocess_face(frame) for frame in frames]  # No detections: embed whole frames
+    faces = (faces * (64 // len(faces) + 1))[:64]
+    print(f"{'embedder':>10} {'faces/s b=1':>12} {'faces/s b=64':>13}")
+    for backend in BACKENDS:
+        embedder = load_embedder(EMBEDDER_WEIGHTS, backend)
+        single = throughput(lambda face: encode_batch(embedder, [face]), faces, 1)
+        batched = throughput(lambda batch: encode_batch(embedder, batch), [faces], len(faces))
+        print(f"{backend:>10} {single:>12.1f} {batched:>13.1f}")
+
+    parity = embedder_parity(EMBEDDER_WEIGHTS, np.stack(faces), embedder_onnx_path(EMBEDDER_WEIGHTS))
+    print(f"embedder parity: max |diff| {parity['max_abs_diff']:.2e}, min cosine {parity['min_cosine']:.6f} "
+          f"({'ok' if parity['ok'] else 'FAILED'})")
+    sys.exit(0 if parity["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
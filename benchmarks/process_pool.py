@@ -0,0 +1,88 @@
+"""Multi-camera throughput of the thread scheduler vs the process pool.
+
+Each video file acts as a camera (they are reused round-robin when there are
+more cameras than files); frames are decoded up front so only inference is
+measured. Every camera loop submits its next frame as soon as the previous
+result arrives, like the websocket/background loops do. Prints total frames/s
+per configuration and the scaling efficiency of each worker count against the
+thread scheduler. Run from the repository root:
+    python benchmarks/process_pool.py clip1.mp4 [clip2.mp4 ...] [--cameras 8] [--workers 1,2,4]
+"""
+import os, sys, time, asyncio, argparse
+
+os.environ.setdefault("APP_ROLE", "api")  # Importing `src` builds the app; keep it light
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cv2
+from src.app.v1.DetectFaces.Services.faceTracker import FaceTracker
+from src.app.v1.DetectFaces.Services.inferenceScheduler import InferenceScheduler
+from src.app.v1.DetectFaces.Services.processPool import ProcessInferencePool
+from src.app.v1.DetectFaces.Services.recognitionPipeline import recognize_frames
+from src.app.v1.CameraSources.services.detectionSettings import DetectionSettings
+
+MAX_FRAMES = 120  # Frames decoded per video
+SECONDS = 20  # Time measured per configuration
+
+
+def load_clip(path):
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < MAX_FRAMES:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        sys.exit(f"Error: no frames decoded from {path}")
+    return frames
+
+
+async def camera(scheduler, frames, deadline, counts, index):
+    tracker, settings = FaceTracker(), DetectionSettings()
+    position = 0
+    while time.perf_counter() < deadline:
+        if await scheduler.submit((frames[position % len(frames)], tracker, settings)) is not None:
+            counts[index] += 1
+        position += 1
+
+
+async def run_cameras(scheduler, clips, cameras):
+    # Warm-up: load the models (in every worker for the pool) before timing
+    await asyncio.gather(*(scheduler.submit((clips[i % len(clips)][0], FaceTracker(), DetectionSettings()))
+                           for i in range(cameras)))
+    counts = [0] * cameras
+    start = time.perf_counter()
+    await asyncio.gather(*(camera(scheduler, clips[i % len(clips)], start + SECONDS, counts, i) for i in range(cameras)))
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def measure(scheduler, clips, cameras):
+    scheduler.start()
+    try:
+        return asyncio.run(run_cameras(scheduler, clips, cameras))
+    finally:
+        scheduler.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--cameras", type=int, default=8)
+    parser.add_argument("--workers", default=",".join(str(2 ** i) for i in range(8) if 2 ** i <= (os.cpu_count() or 1)))
+    args = parser.parse_args()
+
+    clips = [load_clip(path) for path in args.videos]
+    print(f"{args.cameras} cameras from {len(clips)} clip(s), {os.cpu_count()} CPUs\n")
+
+    baseline = measure(InferenceScheduler(recognize_frames), clips, args.cameras)
+    print(f"{'config':>12} {'frames/s':>9} {'speed-up':>9} {'efficiency':>11}")
+    print(f"{'threads':>12} {baseline:>9.1f} {1.0:>9.2f} {'-':>11}")
+    for workers in map(int, args.workers.split(",")):
+        rate = measure(ProcessInferencePool(workers=workers), clips, args.cameras)
+        speedup = rate / baseline
+        print(f"{f'{workers} procs':>12} {rate:>9.1f} {speedup:>9.2f} {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
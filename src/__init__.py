@@ -4,8 +4,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, Response
 from contextlib import asynccontextmanager
 from src.database.db import initDB, engine
-from src.app.v1.DetectFaces.api.controller import *
 from src.app.v1.routes import router as v1Router
+from src.config.variables import APP_ROLE
 import os, sys, asyncio
 from src.app.v1.Functions.models.models import *
 from dotenv import load_dotenv
@@ -20,8 +20,14 @@ sys.dont_write_bytecode = True
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Function id -> running detection task; every task feeds the shared inference_scheduler
+running_functions = {}
+
 async def process_function(func):
     """Run face detection for a given function"""
+    # Imported here so API-only workers (APP_ROLE=api) never load the inference stack
+    from src.app.v1.DetectFaces.api.controller import DetectFacesBackground
+
     print(f"Starting process for function: {func.name}")
     with SessionLocal() as session:  # Use synchronous session
         await DetectFacesBackground(func, session)
@@ -42,8 +48,12 @@ async def schedule_functions():
                     start_time, end_time = map(lambda x: datetime.strptime(x, "%H:%M").time(), func.timeSlot.split(" - "))
                     print(f"Function {func.name} -> Start: {start_time}, End: {end_time}, Now: {now}")
                     if start_time <= now <= end_time:
+                        task = running_functions.get(func.id)
+                        if task and not task.done():
+                            print(f"⏩ Function {func.name} is already running.")
+                            continue
                         print(f"✅ Function {func.name} is scheduled to run!")
-                        asyncio.create_task(process_function(func))
+                        running_functions[func.id] = asyncio.create_task(process_function(func))
                     else:
                         print(f"❌ Function {func.name} is NOT within time range.")
 
@@ -53,7 +63,33 @@ async def schedule_functions():
 async def lifespan(app: FastAPI):
     initDB()  # Initialize the database
 
+    if APP_ROLE != "inference":
+        yield
+        return
+
+    # Dedicated inference worker: load the models before taking traffic and run the scheduled functions
+    # (with INFERENCE_MODE=process the models live in the pool's worker processes instead)
+    from src.app.v1.DetectFaces.api.controller import inference_scheduler
+    from src.app.v1.DetectFaces.Services.processPool import INFERENCE_MODE
+    from src.app.v1.DetectFaces.Services.modelRegistry import get_detector, get_embedder
+    from src.app.v1.DetectFaces.Services.sightingBuffer import sighting_buffer
+    loop = asyncio.get_running_loop()
+    if INFERENCE_MODE == "process":
+        inference_scheduler.start()
+    else:
+        await loop.run_in_executor(None, get_detector)
+        await loop.run_in_executor(None, get_embedder)
+    face_detection_task = loop.create_task(schedule_functions())
+
     yield
+
+    face_detection_task.cancel()
+    try:
+        await face_detection_task
+    except asyncio.CancelledError:
+        pass
+    inference_scheduler.stop()
+    sighting_buffer.stop()  # Write the sightings still buffered
     
 # @asynccontextmanager
 # async def lifespan(app: FastAPI):
@@ -4,12 +4,37 @@ from fastapi.responses import JSONResponse, Response
 from sqlmodel import Session, select
 from typing import Annotated
 from src.app.v1.CameraSources.models.camera_sources import *
+from src.app.v1.CameraSources.schemas import *
 from sqlalchemy.sql.expression import cast
 from sqlalchemy.types import String
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
 
+def build_cameras(username, password, ip_address, no_of_cameras, sub_stream_path=None):
+    """Camera entries of an NVR. `url` is the main stream (recording); `detectionUrl` is the
+    low-resolution sub-stream used for detection when `sub_stream_path` (e.g. "Streaming/Channels/{i}02") is set"""
+    cameras = []
+    for i in range(1, no_of_cameras + 1):
+        camera = {
+            "name": f"Camera {i}",
+            "url": f"rtsp://{username}:{password}@{ip_address}:554/{i}"
+        }
+        if sub_stream_path:
+            camera["detectionUrl"] = f"rtsp://{username}:{password}@{ip_address}:554/{sub_stream_path.format(i=i).lstrip('/')}"
+        cameras.append(camera)
+    return cameras
+
+
+def carry_over_settings(old_cameras, new_cameras):
+    """Keep per-camera detection settings (matched by camera name) when the camera list is regenerated"""
+    settings = {camera.get("name"): camera["detection"] for camera in old_cameras or [] if camera.get("detection")}
+    for camera in new_cameras:
+        if camera["name"] in settings:
+            camera["detection"] = settings[camera["name"]]
+    return new_cameras
+
+
 def AddNewConnection(camera_source: CameraSources, session: SessionDep) -> CameraSources:
     try:
         if camera_source.type != "RTSP":
@@ -25,6 +50,7 @@ def AddNewConnection(camera_source: CameraSources, session: SessionDep) -> Camer
         password = camera_source.sourceCredentials.get("password")
         ip_address = camera_source.sourceDetails.get("ipAddress")
         no_of_cameras = camera_source.sourceDetails.get("NoOfCameras")
+        sub_stream_path = camera_source.sourceDetails.get("subStreamPath")
         
         if not username or not password or not ip_address:
             raise HTTPException(status_code=400, detail="Username, password and IP address are required")
@@ -42,20 +68,15 @@ def AddNewConnection(camera_source: CameraSources, session: SessionDep) -> Camer
                 break
         
         # Generate the full new camera list
-        cameras = [
-            {
-                "name": f"Camera {i}",
-                "url": f"rtsp://{username}:{password}@{ip_address}:554/{i}"
-            }
-            for i in range(1, no_of_cameras + 1)
-        ]
+        cameras = build_cameras(username, password, ip_address, no_of_cameras, sub_stream_path)
         
         if existing_camera_source:
-            # Replace cameras array completely
+            # Replace cameras array completely, keeping each camera's detection settings
             existing_camera_source.sourceDetails = {
                 "ipAddress": ip_address,
                 "NoOfCameras": no_of_cameras,
-                "cameras": cameras
+                "subStreamPath": sub_stream_path,
+                "cameras": carry_over_settings(existing_camera_source.sourceDetails.get("cameras"), cameras)
             }
             print(existing_camera_source.sourceCredentials)
             existing_camera_source.sourceCredentials = camera_source.sourceCredentials
@@ -109,6 +130,7 @@ def UpdateCameraSource(
         password = updated_data.sourceCredentials.get("password")
         ip_address = updated_data.sourceDetails.get("ipAddress")
         no_of_cameras = updated_data.sourceDetails.get("NoOfCameras")
+        sub_stream_path = updated_data.sourceDetails.get("subStreamPath")
 
         if not username or not password or not ip_address:
             raise HTTPException(status_code=400, detail="Username, password, and IP address are required")
@@ -117,20 +139,15 @@ def UpdateCameraSource(
             raise HTTPException(status_code=400, detail="Valid number of cameras is required")
 
         # Generate updated cameras list
-        updated_cameras = [
-            {
-                "name": f"Camera {i}",
-                "url": f"rtsp://{username}:{password}@{ip_address}:554/{i}"
-            }
-            for i in range(1, no_of_cameras + 1)
-        ]
+        updated_cameras = build_cameras(username, password, ip_address, no_of_cameras, sub_stream_path)
 
         # Update only the necessary fields
         camera_source.sourceCredentials = updated_data.sourceCredentials
         camera_source.sourceDetails = {
             "ipAddress": ip_address,
             "NoOfCameras": no_of_cameras,
-            "cameras": updated_cameras  # Completely replacing the cameras array
+            "subStreamPath": sub_stream_path,
+            "cameras": carry_over_settings(camera_source.sourceDetails.get("cameras"), updated_cameras)  # Replacing the cameras array, keeping detection settings
         }
 
         session.commit()
@@ -162,3 +179,33 @@ def DeleteCameraSource(
         session.rollback()
         return JSONResponse(content={"message": "An error occurred while deleting the camera source"}, status_code=500)
 
+
+def UpdateCameraDetectionSettings(
+    camera_id: int,
+    camera_index: int,
+    settings: CameraDetectionSettingsSchema,
+    session: SessionDep
+) -> JSONResponse:
+    """Set the detection settings (inference width, ROI polygons, minimum face size) of one camera of a source"""
+    try:
+        camera_source = session.query(CameraSources).filter(CameraSources.id == camera_id).first()
+        
+        if not camera_source:
+            return JSONResponse(content={"message": "Camera source not found"}, status_code=404)
+        
+        cameras = [dict(camera) for camera in camera_source.sourceDetails.get("cameras", [])]
+        if not 1 <= camera_index <= len(cameras):
+            return JSONResponse(content={"message": "Camera not found"}, status_code=404)
+        
+        cameras[camera_index - 1]["detection"] = settings.model_dump(exclude_none=True)
+        # Reassign the JSON column so the change is persisted
+        camera_source.sourceDetails = {**camera_source.sourceDetails, "cameras": cameras}
+        
+        session.commit()
+        session.refresh(camera_source)
+        
+        return JSONResponse(content={"message": "Detection settings updated successfully", "result": cameras[camera_index - 1]}, status_code=200)
+    except Exception as e:
+        print(e)
+        session.rollback()
+        return JSONResponse(content={"message": "An error occurred while updating the detection settings"}, status_code=500)
@@ -28,6 +28,12 @@ routes = [
         "handler": DeleteCameraSource,
         "name": "Delete camera sources"
     },
+    {
+        "route": "/{camera_id}/cameras/{camera_index}/detection",
+        "method": ["PUT"],
+        "handler": UpdateCameraDetectionSettings,
+        "name": "Update camera detection settings"
+    },
     # {
     #     "route": "/convert/",
     #     "method": ["POST"],
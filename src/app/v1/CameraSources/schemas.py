@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+
+class CameraDetectionSettingsSchema(BaseModel):
+    inferenceWidth: Optional[int] = Field(default=None, ge=160)  # None uses DETECTION_INFERENCE_WIDTH
+    roi: List[List[List[float]]] = []  # Polygons of [x, y] points normalized to [0, 1]; empty means the whole frame
+    minFaceSize: int = Field(default=0, ge=0)  # Pixels, in the original frame
+
+    @field_validator("roi")
+    @classmethod
+    def validate_roi(cls, roi):
+        for polygon in roi:
+            if len(polygon) < 3:
+                raise ValueError("Each ROI polygon needs at least 3 points")
+            for point in polygon:
+                if len(point) != 2 or not all(0 <= value <= 1 for value in point):
+                    raise ValueError("ROI points must be [x, y] pairs normalized to [0, 1]")
+        return roi
+
+    class Config:
+        from_attributes = True
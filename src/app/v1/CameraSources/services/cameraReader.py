@@ -0,0 +1,126 @@
+import os
+import asyncio
+import threading
+from src.app.v1.CameraSources.services.frameDecoder import open_decoder
+
+CAMERA_READ_TIMEOUT = float(os.getenv("CAMERA_READ_TIMEOUT", "10"))  # Seconds without a new frame before a camera counts as stalled
+
+
+class CameraReader:
+    """Decodes one video source in a dedicated thread and keeps only the newest frame.
+
+    Decoding goes through frameDecoder (OpenCV or an FFmpeg pipe, see CAMERA_DECODER).
+
+    Consumers `await latest_frame(after)` from the event loop and always get the most
+    recent decoded frame, so a slow consumer skips stale frames instead of falling
+    behind, and a stalled camera only ever blocks its own reader thread.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._lock = threading.Lock()
+        self._waiters = []
+        self._stopped = threading.Event()
+        self._thread = None
+        self._frame = None
+        self._fetched = False
+        self.seq = 0
+        self.closed = False
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"camera-reader-{self.source}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        decoder = open_decoder(self.source)
+        try:
+            if not decoder.open():
+                print(f"Error: Unable to open video source {self.source}")
+                return
+            while not self._stopped.is_set():
+                frame = decoder.read()
+                if frame is None:
+                    break
+                self._publish(frame)
+        finally:
+            decoder.release()
+            self._publish(None, closed=True)
+
+    def _publish(self, frame, closed=False):
+        with self._lock:
+            if closed:
+                self.closed = True
+            else:
+                if self._frame is not None and not self._fetched:
+                    self.frames_dropped += 1
+                self._frame, self._fetched = frame, False
+                self.seq += 1
+                self.frames_read += 1
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    async def latest_frame(self, after=0, timeout=CAMERA_READ_TIMEOUT):
+        """Return (seq, frame) for the newest frame with a sequence number above `after`.
+
+        The frame is None when the source closed or produced nothing for `timeout` seconds.
+        """
+        with self._lock:
+            if self.seq <= after and not self.closed:
+                future = asyncio.get_running_loop().create_future()
+                self._waiters.append((asyncio.get_running_loop(), future))
+            else:
+                future = None
+        if future is not None:
+            try:
+                await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️ No frame from {self.source} for {timeout}s")
+                return after, None
+
+        with self._lock:
+            if self.seq <= after:
+                return after, None
+            self._fetched = True
+            return self.seq, self._frame
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+# Readers are shared by every consumer of the same source (e.g. two functions on one camera)
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def open_camera(source):
+    """Get the running reader for `source`, starting one if needed"""
+    with _readers_lock:
+        reader, users = _readers.get(source, (None, 0))
+        if reader is None or reader.closed:
+            reader, users = CameraReader(source), 0
+            reader.start()
+        _readers[source] = (reader, users + 1)
+        return reader
+
+
+def close_camera(reader):
+    """Release a reader obtained from open_camera; the last user stops its thread"""
+    with _readers_lock:
+        current, users = _readers.get(reader.source, (None, 0))
+        if current is not reader:
+            reader.stop()
+            return
+        if users <= 1:
+            del _readers[reader.source]
+            reader.stop()
+        else:
+            _readers[reader.source] = (reader, users - 1)
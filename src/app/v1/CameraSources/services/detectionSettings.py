@@ -0,0 +1,120 @@
+import os
+import cv2
+import numpy as np
+from urllib.parse import urlsplit, urlunsplit
+
+DETECTION_INFERENCE_WIDTH = int(os.getenv("DETECTION_INFERENCE_WIDTH", "1280"))  # Frames wider than this are downscaled before YOLO, 0 disables
+DETECTION_MIN_FACE_SIZE = int(os.getenv("DETECTION_MIN_FACE_SIZE", "0"))  # Faces smaller than this (original pixels) are dropped
+
+
+class DetectionSettings:
+    """Per-camera detector input settings, stored as `detection` on the camera entry of a CameraSources row:
+
+        {"inferenceWidth": 960, "roi": [[[0.2, 0.1], [0.6, 0.1], [0.6, 1.0], [0.2, 1.0]]], "minFaceSize": 40}
+
+    `roi` polygons use coordinates normalized to [0, 1]. `prepare()` crops the
+    frame to the ROI bounding box, blacks out everything outside the polygons and
+    downscales to `inferenceWidth`; `to_frame()` maps detector boxes and keypoints
+    back to full-frame pixels and drops faces under `minFaceSize`.
+    """
+
+    def __init__(self, inference_width=DETECTION_INFERENCE_WIDTH, roi=None, min_face_size=DETECTION_MIN_FACE_SIZE):
+        self.inference_width = inference_width
+        self.roi = [np.asarray(polygon, dtype=np.float32) for polygon in roi or []]
+        self.min_face_size = min_face_size
+        self._layouts = {}  # Frame shape -> (crop rect, scale, mask)
+
+    @classmethod
+    def from_camera(cls, camera):
+        detection = (camera or {}).get("detection") or {}
+        return cls(
+            inference_width=detection.get("inferenceWidth") or DETECTION_INFERENCE_WIDTH,
+            roi=detection.get("roi"),
+            min_face_size=detection.get("minFaceSize") or DETECTION_MIN_FACE_SIZE,
+        )
+
+    def as_dict(self):
+        """The `detection` object these settings were built from (round-trips through from_camera)"""
+        return {
+            "inferenceWidth": self.inference_width,
+            "roi": [polygon.tolist() for polygon in self.roi],
+            "minFaceSize": self.min_face_size,
+        }
+
+    def _layout(self, height, width):
+        layout = self._layouts.get((height, width))
+        if layout is not None:
+            return layout
+
+        x1, y1, x2, y2 = 0, 0, width, height
+        polygons = [np.round(polygon * (width, height)).astype(np.int32) for polygon in self.roi]
+        if polygons:
+            points = np.concatenate(polygons)
+            x1, y1 = np.clip(points.min(axis=0), 0, (width - 1, height - 1))
+            x2, y2 = np.clip(points.max(axis=0), (x1 + 1, y1 + 1), (width, height))
+
+        crop_width = x2 - x1
+        scale = min(1.0, self.inference_width / float(crop_width)) if self.inference_width else 1.0
+        size = (max(1, round(crop_width * scale)), max(1, round((y2 - y1) * scale)))
+
+        mask = None
+        if polygons:
+            mask = np.zeros((size[1], size[0]), dtype=np.uint8)
+            cv2.fillPoly(mask, [np.round((polygon - (x1, y1)) * scale).astype(np.int32) for polygon in polygons], 255)
+
+        layout = ((int(x1), int(y1), int(x2), int(y2)), float(scale), size, mask)
+        self._layouts[(height, width)] = layout
+        return layout
+
+    def prepare(self, frame):
+        """Detector input for `frame`, plus the (offset, scale) needed by `to_frame()`"""
+        (x1, y1, x2, y2), scale, size, mask = self._layout(*frame.shape[:2])
+        image = frame[y1:y2, x1:x2]
+        if scale != 1.0:
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        if mask is not None:
+            image = cv2.bitwise_and(image, image, mask=mask)
+        return image, ((x1, y1), scale)
+
+    def to_frame(self, boxes, keypoints, transform):
+        """Map detector boxes (N, 4) and optional keypoints (N, K, 2) back to full-frame pixels.
+
+        Returns (boxes, keypoints) keeping only faces of at least `min_face_size` pixels.
+        """
+        (x1, y1), scale = transform
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4) / scale + (x1, y1, x1, y1)
+        if keypoints is not None:
+            keypoints = np.asarray(keypoints, dtype=np.float32)
+            missing = keypoints <= 0  # ultralytics reports invisible keypoints as (0, 0); keep them that way
+            keypoints = keypoints / scale + (x1, y1)
+            keypoints[missing] = 0
+        if self.min_face_size:
+            keep = np.minimum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]) >= self.min_face_size
+            boxes = boxes[keep]
+            keypoints = keypoints[keep] if keypoints is not None else None
+        return boxes, keypoints
+
+
+def find_camera(camera_sources, url):
+    """The camera entry with stream `url` among CameraSources rows, or None"""
+    for source in camera_sources:
+        for camera in (source.sourceDetails or {}).get("cameras", []):
+            if camera.get("url") == url:
+                return camera
+    return None
+
+
+def strip_credentials(url):
+    """`url` without its user:password@ part"""
+    parts = urlsplit(str(url))
+    return urlunsplit(parts._replace(netloc=parts.netloc.rpartition("@")[2]))
+
+
+def camera_label(camera_sources, url):
+    """Credential-free identifier of the camera with stream `url`: "<source id>/<camera name>", else the URL without userinfo"""
+    for source in camera_sources:
+        for camera in (source.sourceDetails or {}).get("cameras", []):
+            if camera.get("url") == url:
+                return f"{source.id}/{camera.get('name')}"
+    return strip_credentials(url)
+
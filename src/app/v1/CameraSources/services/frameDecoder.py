@@ -0,0 +1,105 @@
+import os
+import subprocess
+import cv2
+import numpy as np
+
+CAMERA_DECODER = os.getenv("CAMERA_DECODER", "opencv").lower()  # "opencv" (cv2.VideoCapture) or "ffmpeg" (FFmpeg pipe)
+FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")
+FFPROBE_PATH = os.getenv("FFPROBE_PATH", "ffprobe")
+FFMPEG_DECODE_THREADS = int(os.getenv("FFMPEG_DECODE_THREADS", "1"))  # Decoder threads per camera
+FFMPEG_HWACCEL = os.getenv("FFMPEG_HWACCEL", "")  # e.g. "vaapi", "cuda", "qsv"; empty decodes in software
+FFMPEG_SKIP_NONKEY = os.getenv("FFMPEG_SKIP_NONKEY", "false").lower() == "true"  # Decode keyframes only (~1 fps on most cameras)
+
+
+class OpenCVDecoder:
+    """Decodes a source with cv2.VideoCapture (the historical behaviour)"""
+
+    def __init__(self, source):
+        self.source = source
+        self._capture = None
+
+    def open(self):
+        self._capture = cv2.VideoCapture(self.source)
+        return self._capture.isOpened()
+
+    def read(self):
+        """Next BGR frame, or None at the end of the stream"""
+        ret, frame = self._capture.read()
+        return frame if ret else None
+
+    def release(self):
+        if self._capture is not None:
+            self._capture.release()
+
+
+class FFmpegDecoder:
+    """Decodes a source in an FFmpeg subprocess that writes raw BGR frames to a pipe.
+
+    Unlike VideoCapture this can cap decoder threads, use a hardware decoder
+    (FFMPEG_HWACCEL) and skip every non-keyframe (FFMPEG_SKIP_NONKEY), which is
+    often all a detection stream needs.
+    """
+
+    def __init__(self, source, threads=FFMPEG_DECODE_THREADS, hwaccel=FFMPEG_HWACCEL, skip_nonkey=FFMPEG_SKIP_NONKEY):
+        self.source = str(source)
+        self.threads = threads
+        self.hwaccel = hwaccel
+        self.skip_nonkey = skip_nonkey
+        self._process = None
+        self.width = self.height = 0
+
+    def _input_options(self):
+        options = ["-rtsp_transport", "tcp"] if self.source.startswith("rtsp://") else []
+        if self.hwaccel:
+            options += ["-hwaccel", self.hwaccel]
+        if self.skip_nonkey:
+            options += ["-skip_frame", "nokey"]
+        return options + ["-threads", str(self.threads)]
+
+    def _probe_size(self):
+        output = subprocess.run(
+            [FFPROBE_PATH, "-v", "error", *(["-rtsp_transport", "tcp"] if self.source.startswith("rtsp://") else []),
+             "-select_streams", "v:0", "-show_entries", "stream=width,height", "-of", "csv=p=0", self.source],
+            capture_output=True, text=True, timeout=30,
+        ).stdout.strip().splitlines()
+        width, height = map(int, output[0].split(",")[:2])
+        return width, height
+
+    def open(self):
+        try:
+            self.width, self.height = self._probe_size()
+        except (IndexError, ValueError, OSError, subprocess.TimeoutExpired) as e:
+            print(f"Error: Unable to probe video source {self.source}: {e}")
+            return False
+        cmd = [
+            FFMPEG_PATH, "-hide_banner", "-loglevel", "error",
+            *self._input_options(),
+            "-i", self.source,
+            "-an", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+        ]
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, bufsize=0)
+        return True
+
+    def read(self):
+        """Next BGR frame, or None at the end of the stream"""
+        frame_size = self.width * self.height * 3
+        buffer = bytearray(frame_size)
+        view, filled = memoryview(buffer), 0
+        while filled < frame_size:
+            count = self._process.stdout.readinto(view[filled:])
+            if not count:
+                return None
+            filled += count
+        return np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, self.width, 3)
+
+    def release(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
+
+def open_decoder(source, decoder=CAMERA_DECODER):
+    """Decoder for `source`; local webcams (integer sources) always use OpenCV"""
+    if decoder == "ffmpeg" and not str(source).isdigit():
+        return FFmpegDecoder(source)
+    return OpenCVDecoder(int(source) if str(source).isdigit() else source)
@@ -0,0 +1,116 @@
+import os
+import hashlib
+import numpy as np
+
+ANN_INDEX_FILE = "allFaces.ivf.npz"  # Stored in MODELS_DIR next to the gallery
+ANN_ENABLED = os.getenv("ANN_ENABLED", "true").lower() == "true"
+ANN_MIN_GALLERY = int(os.getenv("ANN_MIN_GALLERY", "20000"))  # Brute force is faster below this many embeddings
+ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))  # Number of inverted lists, 0 = 4 * sqrt(embeddings)
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))  # Lists scanned per query, higher = better recall, slower
+ANN_RERANK_K = int(os.getenv("ANN_RERANK_K", "32"))  # Candidate embeddings whose identities are re-ranked exactly
+
+KMEANS_ITERATIONS = 10
+KMEANS_MAX_SAMPLES = 100_000
+ASSIGN_CHUNK = 65_536
+
+
+def gallery_signature(matcher):
+    """Fingerprint of a matcher's rows (layout and embedding values), so a stale index is never used"""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(matcher.person_index).tobytes())
+    digest.update(np.ascontiguousarray(matcher.embeddings, dtype=np.float32).tobytes())
+    digest.update("\n".join(map(str, matcher.keys)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _assign(embeddings, centroids):
+    assignments = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), ASSIGN_CHUNK):
+        chunk = embeddings[start:start + ASSIGN_CHUNK]
+        assignments[start:start + ASSIGN_CHUNK] = (chunk @ centroids.T).argmax(axis=1)
+    return assignments
+
+
+class IVFIndex:
+    """Inverted-file index over the L2-normalized rows of a GalleryMatcher.
+
+    Rows are clustered with spherical k-means; a query only scans the `nprobe`
+    lists whose centroids are closest to it, then the identities owning the best
+    `rerank_k` candidate rows are re-ranked exactly against all their embeddings.
+    """
+
+    def __init__(self, centroids, list_offsets, list_rows, signature, nprobe=ANN_NPROBE, rerank_k=ANN_RERANK_K):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.list_offsets = np.asarray(list_offsets, dtype=np.int64)
+        self.list_rows = np.asarray(list_rows, dtype=np.int64)
+        self.signature = str(signature)
+        self.nprobe = nprobe
+        self.rerank_k = rerank_k
+
+    @classmethod
+    def build(cls, matcher, nlist=ANN_NLIST, iterations=KMEANS_ITERATIONS, seed=0):
+        embeddings = matcher.embeddings
+        if nlist <= 0:
+            nlist = int(4 * np.sqrt(len(embeddings)))
+        nlist = max(1, min(nlist, len(embeddings)))
+
+        rng = np.random.default_rng(seed)
+        sample = embeddings
+        if len(embeddings) > KMEANS_MAX_SAMPLES:
+            sample = embeddings[rng.choice(len(embeddings), KMEANS_MAX_SAMPLES, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = _assign(sample, centroids)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=nlist)
+            starts = np.cumsum(counts) - counts
+            sums = np.zeros_like(centroids)
+            sums[counts > 0] = np.add.reduceat(sample[order], starts[counts > 0])
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty lists with random rows instead of leaving dead centroids
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        assignments = _assign(embeddings, centroids)
+        list_rows = np.argsort(assignments, kind="stable")
+        list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=nlist))))
+        return cls(centroids, list_offsets, list_rows, gallery_signature(matcher))
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, list_offsets=self.list_offsets,
+                 list_rows=self.list_rows, signature=np.array(self.signature))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["centroids"], data["list_offsets"], data["list_rows"], data["signature"].item())
+
+    def candidates(self, probes):
+        """Return the gallery rows stored in the `nprobe` closest lists of every probe"""
+        nprobe = max(1, min(self.nprobe, len(self.centroids)))
+        scores = probes @ self.centroids.T
+        closest = np.argpartition(-scores, nprobe - 1, axis=1)[:, :nprobe]
+        return [
+            np.concatenate([self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in lists])
+            for lists in closest
+        ]
+
+
+def load_ann_index(path, matcher):
+    """Load the index built for this gallery, or None when it is missing, stale or not worth it"""
+    if not ANN_ENABLED or len(matcher.embeddings) < ANN_MIN_GALLERY or not os.path.exists(path):
+        return None
+    try:
+        index = IVFIndex.load(path)
+    except Exception as e:
+        print(f"⚠️ Unable to load ANN index {path}: {e}")
+        return None
+    if index.signature != gallery_signature(matcher):
+        print(f"⚠️ ANN index {path} does not match the gallery, using exact matching")
+        return None
+    return index
@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+
+
+class BoundedCache:
+    """Dict-like store for per-stream state with a fixed memory ceiling.
+
+    Entries are kept in last-seen order: writing or touching a key refreshes it,
+    entries unseen for `ttl` seconds expire, and once `max_entries` is reached the
+    least recently seen entry is evicted. Counters make both kinds of eviction
+    visible so long-running streams can be checked for constant memory.
+    """
+
+    def __init__(self, max_entries, ttl, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._last_seen = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        return self._entries[key]
+
+    def __setitem__(self, key, value):
+        self._entries[key] = value
+        self.touch(key)
+        while len(self._entries) > self.max_entries:
+            oldest, _ = self._entries.popitem(last=False)
+            del self._last_seen[oldest]
+            self.evictions += 1
+
+    def __delitem__(self, key):
+        del self._entries[key]
+        del self._last_seen[key]
+
+    def get(self, key, default=None):
+        return self._entries.get(key, default)
+
+    def touch(self, key):
+        """Mark an entry as seen now"""
+        self._entries.move_to_end(key)
+        self._last_seen[key] = self.clock()
+
+    def values(self):
+        return list(self._entries.values())
+
+    def items(self):
+        return list(self._entries.items())
+
+    def expire(self):
+        """Drop every entry not seen within `ttl` seconds"""
+        deadline = self.clock() - self.ttl
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if self._last_seen[oldest] > deadline:
+                break
+            del self[oldest]
+            self.expirations += 1
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,207 @@
+import os
+import math
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+import cv2
+import numpy as np
+
+RECORDING_FPS = int(os.getenv("RECORDING_FPS", "10"))  # Frame rate of saved clips
+PRE_ROLL_SECONDS = float(os.getenv("PRE_ROLL_SECONDS", "10"))  # Footage from before the trigger kept at the start of a clip
+POST_ROLL_SECONDS = float(os.getenv("POST_ROLL_SECONDS", "5"))  # Recording continues this long after the last face
+PRE_ROLL_JPEG_QUALITY = int(os.getenv("PRE_ROLL_JPEG_QUALITY", "85"))  # Pre-roll frames are JPEG-encoded; 0 keeps raw frames (~6 MB each at 1080p)
+PRE_ROLL_MAX_MB = float(os.getenv("PRE_ROLL_MAX_MB", "64"))  # Memory cap of one camera's pre-roll; the oldest frames go first
+RECORDING_QUEUE_SECONDS = 10  # Live footage buffered for a slow disk before frames are dropped
+
+
+def _frame_bytes(frame):
+    return len(frame) if isinstance(frame, bytes) else frame.nbytes
+
+
+class ClipWriter:
+    """Writes one clip from a background thread so encoding and disk I/O never block the detection loop.
+
+    Frames are (timestamp, frame) pairs taken at irregular times (the detection
+    loop skips frames); the writer repeats frames to fill the gaps so the clip
+    plays back in real time at a constant `fps`. `clock_offset` converts those
+    timestamps to wall-clock (epoch) seconds.
+    """
+
+    def __init__(self, path, fps, max_queued, clock_offset=0.0):
+        self.path = path
+        self.fps = fps
+        self.max_queued = max_queued
+        self.clock_offset = clock_offset
+        self.finished = Future()  # Resolves to (epoch of the first frame, duration in seconds) once the file is closed
+        self.dropped = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"clip-writer-{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def write(self, timestamp, frame):
+        if self._queue.qsize() >= self.max_queued:
+            self.dropped += 1  # The disk is behind: the gap is filled by repeating the next frame
+            return
+        self._queue.put_nowait((timestamp, frame))
+
+    def close(self):
+        self._queue.put_nowait(None)
+        return self.finished
+
+    def _run(self):
+        out, size, start, written = None, None, None, 0
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                timestamp, frame = item
+                if isinstance(frame, bytes):
+                    frame = cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if frame is None:
+                        continue
+                if out is None:
+                    size, start = (frame.shape[1], frame.shape[0]), timestamp
+                    out = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, size)
+                    if not out.isOpened():
+                        raise RuntimeError(f"Unable to open video writer for {self.path}")
+                if (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size)
+                # Frames are BGR, which is what VideoWriter expects
+                target = int(round((timestamp - start) * self.fps)) + 1
+                while written < target:
+                    out.write(frame)
+                    written += 1
+            if out is None:
+                raise RuntimeError(f"No frames written to {self.path}")
+            self.finished.set_result((start + self.clock_offset, written / self.fps))
+        except Exception as e:
+            self.finished.set_exception(e)
+        finally:
+            if out is not None:
+                out.release()
+
+
+class ClipRecorder:
+    """Per-camera recorder with pre-roll and post-roll.
+
+    `push()` is called with every frame the camera loop reads and only queues it
+    for the recorder's thread, which owns the ring buffer: while idle it keeps
+    (optionally JPEG-encoded) frames covering the last `pre_roll` seconds, and
+    once `start()` has queued a ClipWriter it hands that buffer over so the clip
+    begins before the trigger, followed by the live frames. `keep_alive()` marks
+    faces in view, and `should_stop()` turns true `post_roll` seconds after the last one.
+    """
+
+    needs_frames = True
+
+    def __init__(self, fps=RECORDING_FPS, pre_roll=PRE_ROLL_SECONDS, post_roll=POST_ROLL_SECONDS, jpeg_quality=PRE_ROLL_JPEG_QUALITY,
+                 max_bytes=PRE_ROLL_MAX_MB * 1024 * 1024):
+        self.fps = fps
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.jpeg_quality = jpeg_quality
+        self.max_bytes = max_bytes
+        self._buffer = deque(maxlen=max(1, math.ceil(pre_roll * fps)))
+        self._buffer_bytes = 0
+        self._last_push = None
+        self._last_seen = None
+        self._writer = None
+        self._queue = queue.Queue()  # Frames and start/stop markers, in camera order
+        self.max_queued = max(1, fps * 2)  # Frames waiting for the thread before new ones are dropped
+        self.clips = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="clip-recorder", daemon=True)
+        self._thread.start()
+
+    @property
+    def recording(self):
+        return self._writer is not None
+
+    def push(self, frame, now):
+        """Offer the current frame; kept at most `fps` times per second"""
+        if self._last_push is not None and now - self._last_push < 1 / self.fps:
+            return
+        self._last_push = now
+        if self._writer is None and self.pre_roll <= 0:
+            return
+        if self._queue.qsize() >= self.max_queued:
+            self.dropped += 1  # Encoding is behind: the writer fills the gap by repeating the next frame
+            return
+        self._queue.put_nowait(("frame", now, frame))
+
+    def _run(self):
+        writer = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            kind, value, frame = item
+            if kind == "start":
+                writer = value
+                for timestamp, buffered in self._buffer:
+                    writer.write(timestamp, buffered)
+                self._buffer.clear()
+                self._buffer_bytes = 0
+            elif kind == "stop":
+                writer.close()
+                writer = None
+            elif writer is not None:
+                writer.write(value, frame)
+            elif self.pre_roll > 0:
+                self._buffer_frame(value, frame)
+        if writer is not None:
+            writer.close()
+        self._buffer.clear()
+        self._buffer_bytes = 0
+
+    def _buffer_frame(self, now, frame):
+        if self.jpeg_quality > 0:
+            ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                return
+            frame = encoded.tobytes()
+        if len(self._buffer) == self._buffer.maxlen:
+            self._buffer_bytes -= _frame_bytes(self._buffer[0][1])
+        self._buffer.append((now, frame))
+        self._buffer_bytes += _frame_bytes(frame)
+        while self._buffer_bytes > self.max_bytes and len(self._buffer) > 1:
+            self._buffer_bytes -= _frame_bytes(self._buffer.popleft()[1])
+
+    def start(self, path, now):
+        """Open a clip at `path` that starts with the buffered pre-roll"""
+        self._writer = ClipWriter(path, self.fps, self._buffer.maxlen + self.fps * RECORDING_QUEUE_SECONDS, time.time() - now)
+        self._queue.put_nowait(("start", self._writer, None))
+        self._last_seen = now
+        self.clips += 1
+
+    def keep_alive(self, now):
+        self._last_seen = now
+
+    def should_stop(self, now):
+        return self._writer is not None and now - self._last_seen >= self.post_roll
+
+    def stop(self):
+        """End the current clip; returns a Future resolved with (epoch of its first frame, duration) once the file is complete"""
+        writer, self._writer = self._writer, None
+        self._queue.put_nowait(("stop", None, None))  # The thread closes the writer after the frames queued before this
+        self.dropped += writer.dropped
+        return writer.finished
+
+    def close(self):
+        """Stop the recorder's thread, closing a clip still being written"""
+        self._queue.put_nowait(None)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "mode": "encode",
+            "recording": self.recording,
+            "queued": self._queue.qsize(),
+            "pre_roll_frames": len(self._buffer),
+            "pre_roll_mb": round(self._buffer_bytes / (1024 * 1024), 1),
+            "clips": self.clips,
+            "dropped": self.dropped + (self._writer.dropped if self._writer else 0),
+        }
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+from src.app.v1.DetectFaces.Services.faceEncoder import FACE_SIZE
+
+ALIGNMENT_VERSION = "keypoints-affine-1"  # Stored with gallery fingerprints; bump when crops change
+
+# Canonical positions of (left eye, right eye, nose, left mouth, right mouth) in a
+# 112x112 aligned face, scaled to the FaceNet input size
+FACE_TEMPLATE = np.array([
+    [38.2946, 51.6963],
+    [73.5318, 51.5014],
+    [56.0252, 71.7366],
+    [41.5493, 92.3655],
+    [70.7299, 92.2041],
+], dtype=np.float32) * (FACE_SIZE / 112.0)
+
+
+def detection_keypoints(result):
+    """5-point landmarks (N, 5, 2) of an ultralytics result, or None if the model has no keypoints"""
+    keypoints = getattr(result, "keypoints", None)
+    if keypoints is None or keypoints.xy is None:
+        return None
+    points = keypoints.xy.cpu().numpy()
+    if points.ndim != 3 or points.shape[1] != 5:
+        return None
+    return points
+
+
+def box_matrix(box):
+    """Affine map of a (x1, y1, x2, y2) box onto the FACE_SIZE square (plain crop + resize)"""
+    x1, y1, x2, y2 = box
+    sx = FACE_SIZE / max(x2 - x1, 1)
+    sy = FACE_SIZE / max(y2 - y1, 1)
+    return np.array([[sx, 0, -x1 * sx], [0, sy, -y1 * sy]], dtype=np.float32)
+
+
+def alignment_matrix(box, keypoints=None):
+    """Similarity transform taking the face's landmarks onto FACE_TEMPLATE.
+
+    Rotation, scale and crop are folded into one 2x3 matrix applied to the full
+    frame. Falls back to the box crop when landmarks are missing or degenerate.
+    """
+    if keypoints is not None and np.all(keypoints > 0):
+        matrix, _ = cv2.estimateAffinePartial2D(np.asarray(keypoints, dtype=np.float32), FACE_TEMPLATE, method=cv2.LMEDS)
+        if matrix is not None:
+            return matrix
+    return box_matrix(box)
+
+
+def align_faces(frame, boxes, keypoints=None):
+    """Warp every face of `frame` straight to FACE_SIZE x FACE_SIZE BGR crops.
+
+    `keypoints` is an optional sequence of (5, 2) landmarks parallel to `boxes`
+    (entries may be None). Each face costs one bilinear warp of its output
+    pixels only; the frame itself is never copied or rotated.
+    """
+    if keypoints is None:
+        keypoints = [None] * len(boxes)
+    return [
+        cv2.warpAffine(frame, alignment_matrix(box, points), (FACE_SIZE, FACE_SIZE),
+                       flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+        for box, points in zip(boxes, keypoints)
+    ]
@@ -0,0 +1,34 @@
+import os
+import cv2
+import numpy as np
+
+FACE_SIZE = 160  # InceptionResnetV1 input resolution
+EMBEDDING_SIZE = 512
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))  # Max faces per forward pass
+
+
+def preprocess_face(face):
+    """Resize a face crop to a 160x160 CHW float32 array scaled to [-1, 1]"""
+    if face.shape[:2] != (FACE_SIZE, FACE_SIZE):  # Aligned faces already have the right size
+        face = cv2.resize(face, (FACE_SIZE, FACE_SIZE))
+    face = np.transpose(face, (2, 0, 1)).astype(np.float32)
+    return (face / 255.0 - 0.5) / 0.5
+
+
+def encode_batch(model, faces, batch_size=EMBED_BATCH_SIZE):
+    """Embed a list of preprocessed faces in as few forward passes as possible.
+
+    `model` is an embedder backend exposing `embed(batch)` (see inferenceBackends).
+    Faces from one frame, several frames or several cameras can be mixed freely;
+    the result is an (N, 512) float32 array in the same order as `faces`.
+    """
+    if len(faces) == 0:
+        return np.zeros((0, EMBEDDING_SIZE), dtype=np.float32)
+
+    batch = np.stack(faces)
+    if batch.shape[1] != 3:  # Ensure the batch is in (N, C, H, W) format
+        batch = batch.transpose(0, 3, 1, 2)
+    batch = np.ascontiguousarray(batch, dtype=np.float32)
+
+    chunks = [model.embed(batch[i:i + batch_size]) for i in range(0, len(batch), batch_size)]
+    return np.concatenate(chunks).astype(np.float32, copy=False)
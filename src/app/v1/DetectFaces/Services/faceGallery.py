@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+from src.app.v1.DetectFaces.Services.galleryMatcher import MATCH_THRESHOLD
+from src.app.v1.DetectFaces.Services.galleryStore import load_gallery, MODELS_DIR, GALLERY_FILE, LEGACY_GALLERY_FILE
+from src.app.v1.DetectFaces.Services.annIndex import load_ann_index, ANN_INDEX_FILE
+
+GALLERY_POLL_SECONDS = float(os.getenv("GALLERY_POLL_SECONDS", "5"))  # 0 disables the file watcher
+
+
+def published_version():
+    """Identity of the gallery files currently on disk; changes whenever TrainFaces publishes"""
+    version = []
+    for file_name in (GALLERY_FILE, LEGACY_GALLERY_FILE, ANN_INDEX_FILE):
+        path = MODELS_DIR + file_name
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+
+class GallerySnapshot:
+    """One immutable gallery build: embeddings, people table and matcher"""
+
+    def __init__(self, version, gallery):
+        self.version = version
+        self.gallery = gallery
+        self.matcher = gallery.matcher()
+        self.matcher.index = load_ann_index(MODELS_DIR + ANN_INDEX_FILE, self.matcher)
+
+    def identify(self, embeddings):
+        """Match a batch of face embeddings, returning one identity dict per face.
+
+        `person_id` is the gallery key (People id) or None for an unknown face.
+        """
+        identities = []
+        for key, distance in self.matcher.match(embeddings):
+            if key is None or distance >= MATCH_THRESHOLD:
+                identities.append({"person_id": None, "name": "Undetected", "image_url": "N/A", "value": "0.00", "distance": distance})
+            else:
+                person = self.gallery.by_key[key]
+                identities.append({"person_id": key, "name": person["name"], "image_url": person["image_url"],
+                                   "value": person.get("value", "0.00"), "distance": distance})
+        return identities
+
+
+class FaceGallery:
+    """Holds the current gallery snapshot and swaps in new builds as they are published.
+
+    Readers take `self.snapshot` once per batch and never wait on a reload: a new
+    snapshot is fully built first and then published with a single reference
+    assignment (copy-on-write).
+    """
+
+    def __init__(self):
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self.snapshot = GallerySnapshot(published_version(), load_gallery())
+
+    def reload(self, force=False):
+        """Load the published gallery if it changed; returns True when a new snapshot was swapped in"""
+        with self._reload_lock:
+            version = published_version()
+            if not force and version == self.snapshot.version:
+                return False
+            try:
+                snapshot = GallerySnapshot(version, load_gallery())
+            except Exception as e:
+                # A half-written or corrupt build must never replace a working gallery
+                print(f"⚠️ Unable to reload face gallery: {e}")
+                return False
+            self.snapshot = snapshot
+            print(f"🔄 Face gallery reloaded: {len(snapshot.matcher)} people")
+            return True
+
+    def watch(self, interval=GALLERY_POLL_SECONDS):
+        """Start a daemon thread that reloads the gallery whenever its files change"""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                self.reload()
+
+        self._watcher = threading.Thread(target=poll, name="face-gallery-watcher", daemon=True)
+        self._watcher.start()
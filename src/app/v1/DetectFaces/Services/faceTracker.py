@@ -0,0 +1,114 @@
+import os
+import numpy as np
+from collections import deque, Counter
+from src.app.v1.DetectFaces.Services.galleryMatcher import MATCH_THRESHOLD
+from src.app.v1.DetectFaces.Services.boundedCache import BoundedCache
+
+TRACK_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", "0.3"))  # Min IoU to continue a track
+TRACK_MAX_MISSES = int(os.getenv("TRACK_MAX_MISSES", "10"))  # Processed frames a track survives unseen
+TRACK_TTL_SECONDS = float(os.getenv("TRACK_TTL_SECONDS", "30"))  # Wall-clock age after which an unseen track expires
+TRACK_MAX_ENTRIES = int(os.getenv("TRACK_MAX_ENTRIES", "64"))  # Hard cap on live tracks per stream
+TRACK_REEMBED_INTERVAL = int(os.getenv("TRACK_REEMBED_INTERVAL", "15"))  # Re-embed confident tracks every N frames
+TRACK_UNCERTAIN_INTERVAL = int(os.getenv("TRACK_UNCERTAIN_INTERVAL", "3"))  # ...and uncertain ones every N frames
+TRACK_UNCERTAIN_MARGIN = float(os.getenv("TRACK_UNCERTAIN_MARGIN", "0.1"))  # Distance band around MATCH_THRESHOLD
+VOTE_WINDOW = 10  # Recent identities voted on for the displayed label
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise intersection-over-union of two lists of (x1, y1, x2, y2) boxes"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-6), 0.0)
+
+
+class Track:
+    """One face followed across frames, with its cached embedding and identity"""
+
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = box
+        self.misses = 0
+        self.frames_since_embed = 0
+        self.embedding = None
+        self.identity = None
+        self.votes = deque(maxlen=VOTE_WINDOW)
+
+    @property
+    def label(self):
+        """Majority identity over the last VOTE_WINDOW recognitions"""
+        return Counter(self.votes).most_common(1)[0][0] if self.votes else "Undetected"
+
+    def needs_embedding(self):
+        if self.identity is None:
+            return True
+        uncertain = abs(self.identity["distance"] - MATCH_THRESHOLD) < TRACK_UNCERTAIN_MARGIN
+        interval = TRACK_UNCERTAIN_INTERVAL if uncertain else TRACK_REEMBED_INTERVAL
+        return self.frames_since_embed >= interval
+
+    def set_identity(self, embedding, identity):
+        self.embedding = embedding
+        self.identity = identity
+        self.frames_since_embed = 0
+        self.votes.append(identity["name"])
+
+
+class FaceTracker:
+    """IoU tracker assigning stable track ids to the faces of one camera stream.
+
+    Tracks live in a BoundedCache, so a stream running for weeks keeps at most
+    TRACK_MAX_ENTRIES tracks no matter how many faces pass by.
+    """
+
+    def __init__(self, max_entries=TRACK_MAX_ENTRIES, ttl=TRACK_TTL_SECONDS):
+        self.tracks = BoundedCache(max_entries, ttl)
+        self._next_id = 1
+        self.created = 0
+
+    def update(self, boxes):
+        """Associate this frame's boxes with tracks; returns the Track for every box"""
+        self.tracks.expire()
+        tracks = self.tracks.values()
+        assigned = [None] * len(boxes)
+
+        if tracks and boxes:
+            overlaps = iou_matrix([track.box for track in tracks], boxes)
+            # Greedy association, best overlap first
+            while True:
+                t, b = np.unravel_index(np.argmax(overlaps), overlaps.shape)
+                if overlaps[t, b] < TRACK_IOU_THRESHOLD:
+                    break
+                assigned[b] = tracks[t]
+                overlaps[t, :] = -1
+                overlaps[:, b] = -1
+
+        for i, box in enumerate(boxes):
+            if assigned[i] is None:
+                assigned[i] = Track(self._next_id, box)
+                self.tracks[self._next_id] = assigned[i]
+                self._next_id += 1
+                self.created += 1
+            else:
+                assigned[i].box = box
+
+        seen = {track.id for track in assigned}
+        for track in self.tracks.values():
+            if track.id in seen:
+                track.misses = 0
+                track.frames_since_embed += 1
+                self.tracks.touch(track.id)
+            else:
+                track.misses += 1
+                if track.misses > TRACK_MAX_MISSES:
+                    del self.tracks[track.id]
+        return assigned
+
+    def stats(self):
+        return {**self.tracks.stats(), "created": self.created}
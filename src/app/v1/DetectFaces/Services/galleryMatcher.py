@@ -0,0 +1,108 @@
+import numpy as np
+
+MATCH_THRESHOLD = 0.5  # Cosine distance above which a face is "Undetected"
+EMBEDDING_SIZE = 512  # InceptionResnetV1 output dimension
+
+
+def normalize_rows(vectors):
+    """L2-normalize every row of a 2D float32 array"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class GalleryMatcher:
+    """Matches batches of face embeddings against every enrolled person at once.
+
+    All stored embeddings live in one L2-normalized float32 matrix whose rows are
+    grouped by person, so a batch of probes costs one matrix multiply followed by
+    a segmented max (min cosine distance) per identity. Large galleries can attach
+    an approximate index (see annIndex.IVFIndex) to avoid scanning every row.
+    """
+
+    def __init__(self, embeddings, person_index, keys, normalized=False):
+        person_index = np.asarray(person_index, dtype=np.int64)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2:
+            embeddings = embeddings.reshape(len(person_index), EMBEDDING_SIZE)
+
+        # Rows of the same person must be contiguous for np.maximum.reduceat
+        order = np.argsort(person_index, kind="stable")
+        if not np.array_equal(order, np.arange(len(order))):
+            embeddings, person_index = embeddings[order], person_index[order]
+
+        self.keys = list(keys)
+        # Pre-normalized (e.g. memory-mapped) matrices are used as-is so their pages stay shared
+        self.embeddings = embeddings if normalized else normalize_rows(embeddings)
+        self.person_index = person_index
+        if len(person_index):
+            self.segment_starts = np.concatenate(([0], np.flatnonzero(np.diff(person_index)) + 1))
+        else:
+            self.segment_starts = np.zeros(0, dtype=np.int64)
+        self.segment_keys = person_index[self.segment_starts]
+        self.segment_ends = np.append(self.segment_starts[1:], len(person_index))
+        self.row_segments = np.repeat(np.arange(len(self.segment_starts)), self.segment_ends - self.segment_starts)
+        self.index = None
+
+    @classmethod
+    def from_people(cls, all_people_faces):
+        """Build a matcher from the {key: {"embeddings": [...], ...}} gallery dict"""
+        keys, rows, person_index = [], [], []
+        for key, data in all_people_faces.items():
+            vectors = data.get("embeddings")
+            if vectors is not None and len(vectors):
+                person_index.extend([len(keys)] * len(vectors))
+                rows.extend(np.asarray(v, dtype=np.float32).ravel() for v in vectors)
+            keys.append(key)  # People without embeddings keep their slot but own no rows
+
+        embeddings = np.stack(rows) if rows else np.zeros((0, EMBEDDING_SIZE), dtype=np.float32)
+        return cls(embeddings, person_index, keys)
+
+    def __len__(self):
+        return len(self.segment_starts)
+
+    def distances(self, probes):
+        """Return an (N, people) matrix of min cosine distance per identity"""
+        probes = normalize_rows(probes)
+        similarities = probes @ self.embeddings.T
+        return 1.0 - np.maximum.reduceat(similarities, self.segment_starts, axis=1)
+
+    def match(self, probes):
+        """Return a (key, distance) pair with the closest person for every probe"""
+        probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        if len(self) == 0 or len(probes) == 0:
+            return [(None, float("inf"))] * len(probes)
+
+        if self.index is not None:
+            return self._match_indexed(normalize_rows(probes))
+
+        distances = self.distances(probes)
+        best = distances.argmin(axis=1)
+        best_distances = distances[np.arange(len(probes)), best]
+        return [
+            (self.keys[self.segment_keys[segment]], float(distance))
+            for segment, distance in zip(best, best_distances)
+        ]
+
+    def _match_indexed(self, probes):
+        matches = []
+        for probe, rows in zip(probes, self.index.candidates(probes)):
+            if len(rows) == 0:
+                matches.append((None, float("inf")))
+                continue
+
+            # Keep the best `rerank_k` candidate rows from the scanned lists
+            if len(rows) > self.index.rerank_k:
+                scores = self.embeddings[rows] @ probe
+                rows = rows[np.argpartition(-scores, self.index.rerank_k - 1)[:self.index.rerank_k]]
+
+            # Exact re-rank of the candidate identities against all of their embeddings
+            segments = np.unique(self.row_segments[rows])
+            lengths = self.segment_ends[segments] - self.segment_starts[segments]
+            exact_rows = np.concatenate([np.arange(self.segment_starts[s], self.segment_ends[s]) for s in segments])
+            similarities = self.embeddings[exact_rows] @ probe
+            best = np.maximum.reduceat(similarities, np.concatenate(([0], np.cumsum(lengths)[:-1])))
+            winner = best.argmax()
+            matches.append((self.keys[self.segment_keys[segments[winner]]], float(1.0 - best[winner])))
+        return matches
@@ -0,0 +1,149 @@
+"""Binary face gallery format.
+
+A published gallery is two files in MODELS_DIR:
+  - allFaces.<build>.npy: one contiguous (embeddings, 512) matrix of L2-normalized
+    vectors, rows grouped by person in table order
+  - allFaces.json: the people table (key, name, image_url, fingerprint, row count)
+    plus the name of the matrix file; replacing it atomically publishes a build.
+    The previous build's matrix stays on disk until the next publish.
+
+The matrix is opened with np.load(mmap_mode="r"), so every uvicorn worker on a
+host maps the same page-cache pages instead of unpickling a private copy.
+
+Convert an existing pickle with:
+    python -m src.app.v1.DetectFaces.Services.galleryStore [path/to/allFaces.pkl]
+"""
+import os
+import sys
+import glob
+import json
+import pickle
+import uuid
+import numpy as np
+from src.app.v1.DetectFaces.Services.galleryMatcher import GalleryMatcher, normalize_rows, EMBEDDING_SIZE
+
+MODELS_DIR = f"{os.getenv('STORAGE_DIR', './storage')}/models/"
+GALLERY_FILE = "allFaces.json"
+LEGACY_GALLERY_FILE = "allFaces.pkl"
+GALLERY_DTYPE = os.getenv("GALLERY_DTYPE", "float32")  # float16 halves the file but each worker upcasts a private copy
+FORMAT_VERSION = 1
+
+
+class Gallery:
+    """Embedding matrix plus people table of one gallery build"""
+
+    def __init__(self, embeddings, people):
+        self.embeddings = embeddings
+        self.people = people
+        counts = np.array([person["count"] for person in people], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.person_index = np.repeat(np.arange(len(people)), counts)
+        self.by_key = {person["key"]: person for person in people}
+
+    @classmethod
+    def from_people_faces(cls, all_people_faces):
+        """Build a gallery from the {key: {"embeddings": [...], ...}} dict used by TrainFaces"""
+        people, rows = [], []
+        for key, data in all_people_faces.items():
+            vectors = data.get("embeddings")
+            vectors = [] if vectors is None else vectors
+            rows.extend(np.asarray(v, dtype=np.float32).ravel() for v in vectors)
+            people.append({
+                "key": str(key),
+                "name": data.get("name", str(key)),
+                "image_url": data.get("image_url", "N/A"),
+                "fingerprint": data.get("fingerprint"),
+                "count": len(vectors),
+            })
+        embeddings = normalize_rows(np.stack(rows)) if rows else np.zeros((0, EMBEDDING_SIZE), dtype=np.float32)
+        return cls(embeddings, people)
+
+    def __len__(self):
+        return len(self.people)
+
+    def to_people_faces(self):
+        """The gallery as a {key: {...}} dict; embeddings are views into the matrix"""
+        return {
+            person["key"]: {
+                "name": person["name"],
+                "image_url": person["image_url"],
+                "fingerprint": person["fingerprint"],
+                "embeddings": list(self.embeddings[self.offsets[i]:self.offsets[i + 1]]),
+            }
+            for i, person in enumerate(self.people)
+        }
+
+    def matcher(self):
+        return GalleryMatcher(self.embeddings, self.person_index, [person["key"] for person in self.people], normalized=True)
+
+
+def publish_gallery(gallery, models_dir=MODELS_DIR, dtype=GALLERY_DTYPE):
+    """Write a gallery build and atomically make it the current one"""
+    os.makedirs(models_dir, exist_ok=True)
+    table_path = os.path.join(models_dir, GALLERY_FILE)
+    previous_file = _read_table(table_path)["embeddings"] if os.path.exists(table_path) else None
+    matrix_file = f"allFaces.{uuid.uuid4().hex[:12]}.npy"
+    np.save(os.path.join(models_dir, matrix_file), np.ascontiguousarray(gallery.embeddings, dtype=dtype))
+
+    table = {
+        "format": FORMAT_VERSION,
+        "dtype": dtype,
+        "embeddings": matrix_file,
+        "people": gallery.people,
+    }
+    tmp_path = os.path.join(models_dir, GALLERY_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(table, f)
+    os.replace(tmp_path, table_path)
+
+    # The previous build's matrix is kept until the next publish: a worker may have read the old
+    # table but not mapped its matrix yet. Workers still mapping an older one keep its pages until they reload
+    for path in glob.glob(os.path.join(models_dir, "allFaces.*.npy")):
+        if os.path.basename(path) not in (matrix_file, previous_file):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _read_table(table_path):
+    with open(table_path) as f:
+        return json.load(f)
+
+
+def load_gallery(models_dir=MODELS_DIR):
+    """Load the published gallery, falling back to a legacy allFaces.pkl and then to an empty one"""
+    table_path = os.path.join(models_dir, GALLERY_FILE)
+    if os.path.exists(table_path):
+        table = _read_table(table_path)
+        try:
+            embeddings = np.load(os.path.join(models_dir, table["embeddings"]), mmap_mode="r")
+        except FileNotFoundError:
+            # Two builds were published between reading the table and mapping its matrix: read the current one
+            table = _read_table(table_path)
+            embeddings = np.load(os.path.join(models_dir, table["embeddings"]), mmap_mode="r")
+        if embeddings.dtype != np.float32:
+            embeddings = embeddings.astype(np.float32)
+        return Gallery(embeddings, table["people"])
+
+    legacy_path = os.path.join(models_dir, LEGACY_GALLERY_FILE)
+    if os.path.exists(legacy_path):
+        print(f"⚠️ Loading legacy {legacy_path}; convert it with python -m src.app.v1.DetectFaces.Services.galleryStore")
+        with open(legacy_path, "rb") as f:
+            return Gallery.from_people_faces(pickle.load(f))
+
+    return Gallery(np.zeros((0, EMBEDDING_SIZE), dtype=np.float32), [])
+
+
+def convert_pickle(pickle_path, models_dir=MODELS_DIR, dtype=GALLERY_DTYPE):
+    """Convert an allFaces.pkl gallery into the binary format"""
+    with open(pickle_path, "rb") as f:
+        gallery = Gallery.from_people_faces(pickle.load(f))
+    publish_gallery(gallery, models_dir, dtype)
+    return gallery
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(MODELS_DIR, LEGACY_GALLERY_FILE)
+    gallery = convert_pickle(source)
+    print(f"Converted {source}: {len(gallery)} people, {len(gallery.embeddings)} embeddings")
@@ -0,0 +1,141 @@
+import os
+import numpy as np
+from src.app.v1.DetectFaces.Services.faceEncoder import FACE_SIZE
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()  # "torch" (eager PyTorch) or "onnx" (ONNX Runtime)
+EMBEDDER_PRECISION = os.getenv("EMBEDDER_PRECISION", "fp32").lower()  # "fp32" or "int8" (quantized ONNX, see quantizeEmbedder)
+ONNX_NUM_THREADS = int(os.getenv("ONNX_NUM_THREADS", "0"))  # ONNX Runtime intra-op threads, 0 keeps its default
+ONNX_OPSET = 17
+PARITY_MIN_COSINE = 0.999  # ONNX embeddings must stay this close to the PyTorch ones
+MODELS_DIR = f"{os.getenv('STORAGE_DIR', './storage')}/models/"
+
+
+class TorchEmbedder:
+    """InceptionResnetV1 run eagerly in PyTorch"""
+
+    precision = "fp32"
+
+    def __init__(self, weights):
+        from facenet_pytorch import InceptionResnetV1
+
+        self.model = InceptionResnetV1(pretrained=weights).eval()
+
+    def embed(self, batch):
+        """(N, 3, 160, 160) float32 faces -> (N, 512) float32 embeddings"""
+        import torch
+
+        with torch.inference_mode():
+            return self.model(torch.from_numpy(batch)).numpy()
+
+
+class OnnxEmbedder:
+    """InceptionResnetV1 exported to ONNX and run by ONNX Runtime on the CPU"""
+
+    def __init__(self, path, precision="fp32"):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_NUM_THREADS > 0:
+            options.intra_op_num_threads = ONNX_NUM_THREADS
+        self.path = path
+        self.precision = precision
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def embed(self, batch):
+        """(N, 3, 160, 160) float32 faces -> (N, 512) float32 embeddings"""
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+def embedder_onnx_path(weights):
+    return f"{MODELS_DIR}facenet-{weights}.onnx"
+
+
+def embedder_int8_path(weights):
+    return f"{MODELS_DIR}facenet-{weights}.int8.onnx"
+
+
+def detector_onnx_path(weights):
+    return os.path.splitext(weights)[0] + ".onnx"
+
+
+def export_embedder(weights, path=None):
+    """Export InceptionResnetV1 to ONNX with a dynamic batch dimension; returns the file path"""
+    import torch
+
+    path = path or embedder_onnx_path(weights)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.onnx.export(
+        TorchEmbedder(weights).model,
+        torch.zeros((1, 3, FACE_SIZE, FACE_SIZE)),
+        tmp_path,
+        input_names=["faces"],
+        output_names=["embeddings"],
+        dynamic_axes={"faces": {0: "batch"}, "embeddings": {0: "batch"}},
+        opset_version=ONNX_OPSET,
+    )
+    os.replace(tmp_path, path)
+    print(f"✅ Exported embedder to {path}")
+    return path
+
+
+def export_detector(weights):
+    """Export the YOLO face detector to ONNX next to its weights; returns the file path"""
+    from ultralytics import YOLO
+
+    path = YOLO(weights).export(format="onnx", dynamic=True, opset=ONNX_OPSET)
+    print(f"✅ Exported detector to {path}")
+    return path
+
+
+def load_detector(weights, backend=INFERENCE_BACKEND):
+    """YOLO detector for the backend. ultralytics runs .onnx weights through ONNX Runtime
+    and returns the same Results objects, so callers do not change."""
+    from ultralytics import YOLO
+
+    if backend == "onnx":
+        path = detector_onnx_path(weights)
+        if not os.path.exists(path):
+            path = export_detector(weights)
+        return YOLO(path)
+    return YOLO(weights)
+
+
+def load_embedder(weights, backend=INFERENCE_BACKEND, precision=EMBEDDER_PRECISION):
+    """Embedder exposing `embed(batch)` for the backend, exporting the ONNX model on first use.
+
+    INT8 always runs on ONNX Runtime, whatever the backend. Its model needs the
+    calibration step in quantizeEmbedder; without it the fp32 model is used.
+    """
+    if precision == "int8":
+        path = embedder_int8_path(weights)
+        if os.path.exists(path):
+            return OnnxEmbedder(path, precision="int8")
+        print(f"⚠️ No INT8 embedder at {path}, run quantizeEmbedder first. Using fp32.")
+    if backend == "onnx":
+        path = embedder_onnx_path(weights)
+        if not os.path.exists(path):
+            export_embedder(weights, path)
+        return OnnxEmbedder(path)
+    return TorchEmbedder(weights)
+
+
+def embedder_parity(weights, faces, path=None):
+    """Compare ONNX and PyTorch embeddings of the same preprocessed faces.
+
+    Returns the largest absolute difference, the lowest per-face cosine similarity
+    and whether it clears PARITY_MIN_COSINE.
+    """
+    faces = np.ascontiguousarray(faces, dtype=np.float32)
+    reference = TorchEmbedder(weights).embed(faces)
+    candidate = OnnxEmbedder(path or embedder_onnx_path(weights)).embed(faces)
+    cosine = np.sum(reference * candidate, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1) + 1e-12)
+    min_cosine = float(cosine.min())
+    return {
+        "max_abs_diff": float(np.abs(reference - candidate).max()),
+        "min_cosine": min_cosine,
+        "ok": min_cosine >= PARITY_MIN_COSINE,
+    }
@@ -0,0 +1,100 @@
+import os
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))  # Threads running batched inference
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "8"))  # Max frames per batched pass
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))  # Frames waiting before new ones are dropped
+
+
+class InferenceScheduler:
+    """Shared inference stage for every camera of the process.
+
+    Camera loops `await submit(item)`; items wait in one bounded queue and a pool
+    of worker threads drains it in batches of up to `max_batch`, calling
+    `process_batch(items)` once per batch so frames from many cameras share a
+    single detector/embedder pass. The event loop never runs inference itself.
+    """
+
+    def __init__(self, process_batch, workers=INFERENCE_WORKERS, max_batch=INFERENCE_MAX_BATCH, queue_size=INFERENCE_QUEUE_SIZE):
+        self.process_batch = process_batch
+        self.workers = workers
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self.processed = 0
+        self.dropped = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"inference-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        with self._start_lock:
+            for _ in self._threads:
+                self._queue.put(None)
+            self._threads = []
+
+    async def submit(self, item):
+        """Queue an item and wait for its result; returns None if the queue is full and the item was dropped"""
+        self.start()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            # Inference is behind: drop this frame rather than let latency grow
+            self.dropped += 1
+            return None
+        return await asyncio.wrap_future(future)
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is None:
+                self._queue.put(None)  # Leave the stop signal for this worker's next round
+                break
+            batch.append(pending)
+        return batch
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Skip frames whose camera loop stopped waiting (e.g. websocket closed)
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = self.process_batch(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self.processed += len(batch)
+
+    def stats(self):
+        return {
+            "workers": len(self._threads),
+            "queued": self._queue.qsize(),
+            "processed": self.processed,
+            "dropped": self.dropped,
+        }
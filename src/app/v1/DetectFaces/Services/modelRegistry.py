@@ -0,0 +1,100 @@
+import os
+import time
+import threading
+import numpy as np
+import psutil
+from src.app.v1.DetectFaces.Services.inferenceBackends import INFERENCE_BACKEND, load_detector, load_embedder
+
+DETECTOR_WEIGHTS = os.getenv("DETECTOR_WEIGHTS", "yolov8n-face.pt")
+EMBEDDER_WEIGHTS = os.getenv("EMBEDDER_WEIGHTS", "vggface2")
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))  # Intra-op threads per process, 0 keeps torch's default
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"  # Run one dummy inference right after loading
+
+# The ultralytics predictor may not be called from two threads at once. Every caller of the
+# shared detector (camera inference workers and training alike) must hold this lock.
+detector_lock = threading.Lock()
+
+
+def _configure_torch():
+    import torch
+
+    if TORCH_NUM_THREADS > 0:
+        torch.set_num_threads(TORCH_NUM_THREADS)
+
+
+def _load_detector():
+    detector = load_detector(DETECTOR_WEIGHTS)
+    if MODEL_WARMUP:
+        with detector_lock:
+            detector(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+    return detector
+
+
+def _load_embedder():
+    embedder = load_embedder(EMBEDDER_WEIGHTS)
+    if MODEL_WARMUP:
+        embedder.embed(np.zeros((1, 3, 160, 160), dtype=np.float32))
+    return embedder
+
+
+class ModelRegistry:
+    """Process-wide home of the inference models.
+
+    Each model is loaded on first use, exactly once per process, no matter how
+    many modules ask for it. Load (and warm-up) times are recorded for `stats()`.
+    """
+
+    loaders = {
+        "detector": _load_detector,
+        "embedder": _load_embedder,
+    }
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+        self._torch_configured = False
+        self.load_seconds = {}
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            if name not in self._models:
+                if not self._torch_configured:
+                    _configure_torch()
+                    self._torch_configured = True
+                start = time.perf_counter()
+                self._models[name] = self.loaders[name]()
+                self.load_seconds[name] = round(time.perf_counter() - start, 3)
+                print(f"✅ Loaded {name} in {self.load_seconds[name]}s")
+            return self._models[name]
+
+    def loaded(self):
+        return list(self._models)
+
+    def stats(self):
+        memory = psutil.Process().memory_info()
+        stats = {
+            "backend": INFERENCE_BACKEND,
+            "embedder_precision": self._models["embedder"].precision if "embedder" in self._models else None,
+            "loaded": self.loaded(),
+            "load_seconds": dict(self.load_seconds),
+            "rss_mb": round(memory.rss / 2**20, 1),
+        }
+        if self._torch_configured:
+            import torch
+
+            stats["torch_threads"] = torch.get_num_threads()
+        return stats
+
+
+models = ModelRegistry()
+
+
+def get_detector():
+    return models.get("detector")
+
+
+def get_embedder():
+    return models.get("embedder")
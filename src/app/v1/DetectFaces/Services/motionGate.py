@@ -0,0 +1,72 @@
+import os
+import cv2
+import numpy as np
+
+MOTION_WIDTH = 160  # Frames are compared at this width, in grayscale
+MOTION_PIXEL_DELTA = int(os.getenv("MOTION_PIXEL_DELTA", "25"))  # Grey-level change that counts a pixel as changed
+MOTION_MIN_AREA = float(os.getenv("MOTION_MIN_AREA", "0.005"))  # Fraction of changed pixels that counts as motion
+MOTION_HOLD_SECONDS = float(os.getenv("MOTION_HOLD_SECONDS", "3"))  # Stay at the active rate this long after motion or a face
+IDLE_SAMPLE_RATE = float(os.getenv("IDLE_SAMPLE_RATE", "1"))  # Frames/sec sent to the detector while the scene is still
+ACTIVE_SAMPLE_RATE = float(os.getenv("ACTIVE_SAMPLE_RATE", "10"))  # Frames/sec sent to the detector while something moves
+
+
+class MotionGate:
+    """Decides which frames of a stream are worth running the detector on.
+
+    Every frame is compared with the previous one on a tiny blurred grayscale
+    copy (well under a millisecond). While the scene is still, frames are
+    sampled at `idle_rate`; motion, or faces reported through `keep_active()`,
+    switch the stream to `active_rate` for the next MOTION_HOLD_SECONDS.
+    """
+
+    def __init__(self, idle_rate=IDLE_SAMPLE_RATE, active_rate=ACTIVE_SAMPLE_RATE, hold_seconds=MOTION_HOLD_SECONDS):
+        self.idle_rate = idle_rate
+        self.active_rate = active_rate
+        self.hold_seconds = hold_seconds
+        self._previous = None
+        self._next_sample = 0.0
+        self.active_until = 0.0
+        self.frames_seen = 0
+        self.frames_sampled = 0
+        self.motion_frames = 0
+
+    def motion(self, frame):
+        """True when enough of the scene changed since the previous frame"""
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (MOTION_WIDTH, max(1, height * MOTION_WIDTH // width)), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        previous, self._previous = self._previous, gray
+        if previous is None or previous.shape != gray.shape:
+            return True
+        changed = np.count_nonzero(cv2.absdiff(gray, previous) > MOTION_PIXEL_DELTA)
+        return changed >= MOTION_MIN_AREA * gray.size
+
+    def keep_active(self, now):
+        """Hold the active rate, e.g. while faces are still in view"""
+        self.active_until = max(self.active_until, now + self.hold_seconds)
+
+    def active(self, now):
+        return now < self.active_until
+
+    def should_process(self, frame, now):
+        """Look at a frame (timestamp `now`, seconds) and decide whether to run detection on it"""
+        self.frames_seen += 1
+        if self.motion(frame):
+            self.motion_frames += 1
+            self.keep_active(now)
+
+        if now < self._next_sample:
+            return False
+        rate = self.active_rate if self.active(now) else self.idle_rate
+        self._next_sample = now + 1.0 / max(rate, 1e-3)
+        self.frames_sampled += 1
+        return True
+
+    def stats(self):
+        return {
+            "frames_seen": self.frames_seen,
+            "frames_sampled": self.frames_sampled,
+            "motion_frames": self.motion_frames,
+            "idle_rate": self.idle_rate,
+            "active_rate": self.active_rate,
+        }
@@ -0,0 +1,350 @@
+import os
+import queue
+import asyncio
+import weakref
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import Future
+import numpy as np
+from src.app.v1.DetectFaces.Services.inferenceScheduler import INFERENCE_MAX_BATCH, INFERENCE_QUEUE_SIZE
+
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "thread").lower()  # "thread" (in-process scheduler) or "process" (worker pool)
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", str(os.cpu_count() or 1)))  # Inference processes
+PROCESS_TORCH_THREADS = int(os.getenv("PROCESS_TORCH_THREADS", "1"))  # Torch threads inside each inference process
+PROCESS_RESULT_TIMEOUT = float(os.getenv("PROCESS_RESULT_TIMEOUT", "30"))  # Seconds before a frame's result is given up on
+RING_SLOTS = 2  # Frames per camera ring; a slot is reused only once the worker has answered for its frame
+WORKER_STREAM_TTL = 300  # Seconds after which a worker forgets the tracker of a silent camera
+WORKER_MAX_STREAMS = 256
+
+
+class FrameRing:
+    """Shared-memory ring of fixed-size frame slots for one camera.
+
+    The camera loop copies each frame into a free slot and only sends the
+    slot's (name, offset, shape) to the worker, so frames never go through a pipe.
+    A slot stays taken until the worker's answer for its frame is acknowledged,
+    even if the camera loop gave up waiting, since the worker may still be reading it.
+    """
+
+    def __init__(self, capacity, slots=RING_SLOTS):
+        self.capacity = capacity
+        self.slots = slots
+        self.shm = shared_memory.SharedMemory(create=True, size=capacity * slots)
+        self.name = self.shm.name
+        self._free = list(range(slots))
+        self._retired = False
+        self._lock = threading.Lock()
+
+    def write(self, frame):
+        """Copy `frame` into a free slot; returns (slot, location), or None while every slot is in flight"""
+        with self._lock:
+            if self._retired or not self._free:
+                return None
+            index = self._free.pop(0)
+        offset = index * self.capacity
+        slot = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.shm.buf, offset=offset)
+        slot[...] = frame
+        del slot  # Drop the view so the segment can be closed
+        return index, (self.name, offset, frame.shape)
+
+    def acknowledge(self, index):
+        """The worker is done with slot `index`; returns True when a retired ring has nothing left in flight"""
+        with self._lock:
+            self._free.append(index)
+            return self._retired and len(self._free) == self.slots
+
+    def retire(self):
+        """Take no more frames; returns True if nothing is in flight, so the ring can be released now"""
+        with self._lock:
+            self._retired = True
+            return len(self._free) == self.slots
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _attach(name):
+    """Open an existing segment without letting this process's resource tracker unlink it at exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _worker_main(requests, results, max_batch):
+    """Inference process: owns its models, gallery and the trackers of the cameras routed to it"""
+    # Imported here, after the parent set this process's environment (see ProcessInferencePool.start)
+    from src.app.v1.DetectFaces.Services.recognitionPipeline import recognize_frames
+    from src.app.v1.DetectFaces.Services.faceTracker import FaceTracker
+    from src.app.v1.DetectFaces.Services.boundedCache import BoundedCache
+    from src.app.v1.CameraSources.services.detectionSettings import DetectionSettings
+
+    streams = BoundedCache(WORKER_MAX_STREAMS, WORKER_STREAM_TTL)  # Stream key -> (FaceTracker, DetectionSettings)
+    segments = {}
+    running = True
+    while running:
+        messages = [requests.get()]
+        while len(messages) < max_batch:
+            try:
+                messages.append(requests.get_nowait())
+            except queue.Empty:
+                break
+
+        frames, releases = [], []
+        for message in messages:
+            if message is None:
+                running = False
+            elif message[0] == "frame":
+                frames.append(message[1:])
+            else:
+                releases.append(message[1:])
+
+        streams.expire()
+        if frames:
+            request_ids, items = [], []
+            for request_id, key, (name, offset, shape), settings in frames:
+                if key not in streams or settings is not None:
+                    streams[key] = (FaceTracker(), DetectionSettings.from_camera({"detection": settings}))
+                streams.touch(key)
+                tracker, detection_settings = streams[key]
+                if name not in segments:
+                    segments[name] = _attach(name)
+                frame = np.ndarray(shape, dtype=np.uint8, buffer=segments[name].buf, offset=offset)
+                request_ids.append(request_id)
+                items.append((frame, tracker, detection_settings))
+            try:
+                outputs = recognize_frames(items)
+                for request_id, output, (_, tracker, _) in zip(request_ids, outputs, items):
+                    results.put((request_id, output, None, tracker.stats()))  # The parent's tracker of the stream stays empty
+            except Exception as e:
+                for request_id in request_ids:
+                    results.put((request_id, None, repr(e), None))
+            items = frame = tracker = None  # Release the shared-memory views before segments may be closed
+
+        for key, name in releases:
+            if key is not None and key in streams:
+                del streams[key]
+            segment = segments.pop(name, None)
+            if segment is not None:
+                segment.close()
+
+    for segment in segments.values():
+        segment.close()
+
+
+class ProcessInferencePool:
+    """Drop-in replacement for InferenceScheduler that runs the pipeline in worker processes.
+
+    Each camera stream (identified by its FaceTracker object) is pinned to one
+    worker, which keeps the real tracker for it, and gets its own FrameRing.
+    Workers batch frames of their cameras like the thread scheduler does and
+    send back only the small detection dicts. Cameras spread over workers, so
+    throughput grows with the number of cores instead of being capped by the GIL.
+    """
+
+    def __init__(self, workers=PROCESS_WORKERS, max_batch=INFERENCE_MAX_BATCH, queue_size=INFERENCE_QUEUE_SIZE):
+        self.workers = workers
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = []
+        self._queues = []
+        self._results = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+        self._pending = {}
+        self._request_ids = itertools.count()
+        self._streams = {}  # Stream key -> {"worker", "ring", "sent", "tracks"}
+        self._in_flight = {}  # Request id -> (worker, stream key, ring, slot) until the worker answers
+        self._retiring = {}  # Ring name -> (worker, stream key, ring) of rings released once their frames are answered
+        self.processed = 0
+        self.dropped = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def _spawn(self, index):
+        requests = self._context.Queue(maxsize=self.queue_size)
+        process = self._context.Process(target=_worker_main, args=(requests, self._results, self.max_batch),
+                                        name=f"inference-process-{index}", daemon=True)
+        process.start()
+        return process, requests
+
+    def start(self):
+        with self._start_lock:
+            if self._processes:
+                return
+            self._results = self._context.Queue()
+            # Children inherit the environment at spawn time: they only need the Services modules
+            # (not the API routes) and get a small torch thread pool each, so N processes share the cores.
+            saved = {name: os.environ.get(name) for name in ("APP_ROLE", "TORCH_NUM_THREADS")}
+            os.environ["APP_ROLE"] = "api"
+            os.environ["TORCH_NUM_THREADS"] = str(PROCESS_TORCH_THREADS)
+            try:
+                for index in range(self.workers):
+                    process, requests = self._spawn(index)
+                    self._processes.append(process)
+                    self._queues.append(requests)
+            finally:
+                for name, value in saved.items():
+                    if value is None:
+                        os.environ.pop(name, None)
+                    else:
+                        os.environ[name] = value
+            self._listener = threading.Thread(target=self._listen, name="inference-results", daemon=True)
+            self._listener.start()
+
+    def stop(self):
+        with self._start_lock:
+            for requests in self._queues:
+                requests.put(None)
+            for process in self._processes:
+                process.join(timeout=5)
+            self._processes, self._queues = [], []
+            if self._results is not None:
+                self._results.put(None)
+            for stream in self._streams.values():
+                stream["ring"].close()
+            for _, _, ring in self._retiring.values():
+                ring.close()
+            self._streams.clear()
+            self._in_flight.clear()
+            self._retiring.clear()
+
+    def _listen(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                return
+            request_id, output, error, tracks = message
+            key = self._acknowledge(request_id)
+            if tracks is not None and key in self._streams:
+                self._streams[key]["tracks"] = tracks
+            future = self._pending.pop(request_id, None)
+            if future is None or not future.set_running_or_notify_cancel():
+                continue
+            if error is None:
+                future.set_result(output)
+                self.processed += 1
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _check_worker(self, index):
+        """Respawn a worker that died; its cameras resend their settings and start new tracks"""
+        if self._processes[index].is_alive():
+            return
+        print(f"⚠️ Inference process {index} died, restarting it")
+        with self._start_lock:
+            self._processes[index], self._queues[index] = self._spawn(index)
+        self.restarts += 1
+        for stream in self._streams.values():
+            if stream["worker"] == index:
+                stream["sent"] = False
+        # The dead worker will not answer for its frames: their slots are free again
+        for request_id, (worker, _, _, _) in list(self._in_flight.items()):
+            if worker == index:
+                self._acknowledge(request_id)
+
+    def _stream(self, tracker, frame):
+        key = id(tracker)
+        stream = self._streams.get(key)
+        if stream is None:
+            loads = [0] * self.workers
+            for other in self._streams.values():
+                loads[other["worker"]] += 1
+            stream = {"worker": loads.index(min(loads)), "ring": FrameRing(frame.nbytes), "sent": False, "tracks": None}
+            self._streams[key] = stream
+            weakref.finalize(tracker, self._release, key)
+        elif frame.nbytes > stream["ring"].capacity:
+            # The camera's resolution grew: move it to a bigger ring, the old one goes once its frames are answered
+            self._retire_ring(stream["worker"], None, stream["ring"])
+            stream["ring"] = FrameRing(frame.nbytes)
+        return key, stream
+
+    def _acknowledge(self, request_id):
+        """Free the ring slot of an answered (or abandoned) request; returns its stream key"""
+        entry = self._in_flight.pop(request_id, None)
+        if entry is None:
+            return None
+        worker, key, ring, slot = entry
+        if ring.acknowledge(slot):
+            worker, release_key, _ = self._retiring.pop(ring.name, (worker, None, ring))
+            self._release_ring(worker, release_key, ring)
+        return key
+
+    def _retire_ring(self, worker, key, ring):
+        if ring.retire():
+            self._release_ring(worker, key, ring)
+        else:
+            self._retiring[ring.name] = (worker, key, ring)
+
+    def _release_ring(self, worker, key, ring):
+        try:
+            self._queues[worker].put_nowait(("release", key, ring.name))
+        except (queue.Full, IndexError, ValueError):
+            pass  # The worker forgets the stream through its TTL instead
+        ring.close()
+
+    def _release(self, key):
+        """The camera loop ended (its tracker was garbage collected): free its ring and worker state"""
+        stream = self._streams.pop(key, None)
+        if stream is not None:
+            self._retire_ring(stream["worker"], key, stream["ring"])
+
+    async def submit(self, item):
+        """Run one (frame, tracker, settings) item on the stream's worker; returns None if it was dropped"""
+        frame, tracker, settings = item
+        self.start()
+        key, stream = self._stream(tracker, frame)
+        self._check_worker(stream["worker"])
+
+        written = stream["ring"].write(np.ascontiguousarray(frame, dtype=np.uint8))
+        if written is None:
+            # Every slot still holds a frame the worker has not answered for (e.g. after timeouts)
+            self.dropped += 1
+            return None
+        slot, location = written
+        request_id = next(self._request_ids)
+        future = Future()
+        self._pending[request_id] = future
+        self._in_flight[request_id] = (stream["worker"], key, stream["ring"], slot)
+        try:
+            self._queues[stream["worker"]].put_nowait(
+                ("frame", request_id, key, location, None if stream["sent"] else settings.as_dict()))
+        except queue.Full:
+            # The worker is behind: drop this frame rather than let latency grow
+            self._pending.pop(request_id, None)
+            self._acknowledge(request_id)
+            self.dropped += 1
+            return None
+        stream["sent"] = True
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), PROCESS_RESULT_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._pending.pop(request_id, None)
+            self.timeouts += 1
+            print(f"⚠️ No inference result within {PROCESS_RESULT_TIMEOUT}s, skipping frame")
+            return None
+
+    def tracker_stats(self, tracker):
+        """Track stats of a stream as last reported by its worker, which holds the real tracker"""
+        stream = self._streams.get(id(tracker))
+        return stream["tracks"] if stream else None
+
+    def stats(self):
+        return {
+            "mode": "process",
+            "workers": sum(process.is_alive() for process in self._processes),
+            "streams": len(self._streams),
+            "pending": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
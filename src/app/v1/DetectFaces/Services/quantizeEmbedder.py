@@ -0,0 +1,139 @@
+import os
+import json
+import cv2
+import numpy as np
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+from onnxruntime.quantization.shape_inference import quant_pre_process
+from src.app.v1.DetectFaces.Services.faceEncoder import encode_batch
+from src.app.v1.DetectFaces.Services.galleryMatcher import GalleryMatcher, MATCH_THRESHOLD
+from src.app.v1.DetectFaces.Services.inferenceBackends import (
+    OnnxEmbedder, TorchEmbedder, embedder_onnx_path, embedder_int8_path, export_embedder,
+)
+from src.app.v1.DetectFaces.Services.modelRegistry import EMBEDDER_WEIGHTS
+from src.app.v1.DetectFaces.Services.trainFaces import USER_STORAGE_DIR, get_labels, extract_faces, extract_frames
+
+CALIBRATION_MAX_FACES = int(os.getenv("CALIBRATION_MAX_FACES", "500"))  # Enrolled faces fed through the calibrator
+CALIBRATION_BATCH = 16
+PROBES_PER_PERSON = 10  # Video faces per person used to measure recognition accuracy
+
+
+class FaceCalibrationReader(CalibrationDataReader):
+    """Feeds preprocessed enrolled faces to the ONNX Runtime calibrator in small batches"""
+
+    def __init__(self, faces):
+        self.batches = iter([
+            {"faces": np.ascontiguousarray(faces[i:i + CALIBRATION_BATCH], dtype=np.float32)}
+            for i in range(0, len(faces), CALIBRATION_BATCH)
+        ])
+
+    def get_next(self):
+        return next(self.batches, None)
+
+
+def enrolled_faces():
+    """(person key, profile faces, video faces) for every enrolled person"""
+    people = []
+    for folder_name, _, _ in get_labels():
+        person_folder = os.path.join(USER_STORAGE_DIR, folder_name)
+        profile_faces, video_faces = [], []
+        image = cv2.imread(os.path.join(person_folder, "profile.jpeg"))
+        if image is not None:
+            profile_faces = extract_faces(image)
+        video_path = os.path.join(person_folder, "video.mp4")
+        if os.path.exists(video_path):
+            for frame in extract_frames(video_path, frame_interval=10):
+                video_faces.extend(extract_faces(frame))
+                if len(video_faces) >= PROBES_PER_PERSON:
+                    break
+        people.append((folder_name, profile_faces, video_faces[:PROBES_PER_PERSON]))
+    return people
+
+
+def quantize_embedder(calibration_faces, weights=EMBEDDER_WEIGHTS):
+    """Statically quantize the ONNX embedder to INT8, calibrated on `calibration_faces`; returns the file path"""
+    fp32_path = embedder_onnx_path(weights)
+    if not os.path.exists(fp32_path):
+        export_embedder(weights, fp32_path)
+
+    int8_path = embedder_int8_path(weights)
+    prepared_path = int8_path + ".prep"
+    tmp_path = int8_path + ".tmp"
+    quant_pre_process(fp32_path, prepared_path)
+    try:
+        quantize_static(
+            prepared_path,
+            tmp_path,
+            FaceCalibrationReader(calibration_faces),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+        )
+        os.replace(tmp_path, int8_path)
+    finally:
+        if os.path.exists(prepared_path):
+            os.remove(prepared_path)
+    print(f"✅ Quantized embedder written to {int8_path}")
+    return int8_path
+
+
+def recognition(gallery_embedder, probe_embedder, people):
+    """Top-1 accuracy and accepted-correct rate at MATCH_THRESHOLD of video faces against profile faces"""
+    gallery = {key: {"embeddings": list(encode_batch(gallery_embedder, profile))} for key, profile, _ in people}
+    matcher = GalleryMatcher.from_people(gallery)
+    truths, probes = [], []
+    for key, _, video in people:
+        truths.extend([key] * len(video))
+        probes.extend(video)
+    if not probes:
+        return {"probes": 0}, []
+
+    matches = matcher.match(encode_batch(probe_embedder, probes))
+    top1 = [key == truth for (key, _), truth in zip(matches, truths)]
+    accepted = [key == truth and distance < MATCH_THRESHOLD for (key, distance), truth in zip(matches, truths)]
+    return {
+        "probes": len(probes),
+        "top1_accuracy": round(float(np.mean(top1)), 4),
+        "accepted_correct": round(float(np.mean(accepted)), 4),
+    }, [key for key, _ in matches]
+
+
+def quantization_report(people, weights=EMBEDDER_WEIGHTS):
+    """Cosine drift of INT8 against fp32 embeddings, and recognition accuracy of both on the local gallery.
+
+    `int8_probes_fp32_gallery` is what happens if the gallery is not re-trained after switching.
+    """
+    fp32 = TorchEmbedder(weights)
+    int8 = OnnxEmbedder(embedder_int8_path(weights), precision="int8")
+
+    faces = [face for _, profile, video in people for face in profile + video]
+    if not faces:
+        return {"faces": 0}
+    reference, quantized = encode_batch(fp32, faces), encode_batch(int8, faces)
+    cosine = np.sum(reference * quantized, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(quantized, axis=1) + 1e-12)
+
+    fp32_accuracy, fp32_keys = recognition(fp32, fp32, people)
+    int8_accuracy, int8_keys = recognition(int8, int8, people)
+    mixed_accuracy, _ = recognition(fp32, int8, people)
+    return {
+        "faces": len(faces),
+        "cosine_drift": {
+            "mean": round(float(1 - cosine.mean()), 5),
+            "p99": round(float(1 - np.percentile(cosine, 1)), 5),
+            "max": round(float(1 - cosine.min()), 5),
+        },
+        "fp32": fp32_accuracy,
+        "int8": int8_accuracy,
+        "int8_probes_fp32_gallery": mixed_accuracy,
+        "top1_agreement": round(float(np.mean([a == b for a, b in zip(fp32_keys, int8_keys)])), 4) if fp32_keys else None,
+    }
+
+
+if __name__ == "__main__":
+    people = enrolled_faces()
+    calibration_faces = [face for _, profile, _ in people for face in profile][:CALIBRATION_MAX_FACES]
+    if not calibration_faces:
+        raise SystemExit(f"No enrolled profile faces found under {USER_STORAGE_DIR}")
+    quantize_embedder(calibration_faces)
+    print(json.dumps(quantization_report(people), indent=2))
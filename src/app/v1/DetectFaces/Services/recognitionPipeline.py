@@ -0,0 +1,73 @@
+import threading
+from src.app.v1.DetectFaces.Services.faceEncoder import preprocess_face, encode_batch
+from src.app.v1.DetectFaces.Services.faceAlignment import align_faces, detection_keypoints
+from src.app.v1.DetectFaces.Services.faceGallery import FaceGallery
+from src.app.v1.DetectFaces.Services.modelRegistry import get_detector, get_embedder, detector_lock
+
+# Models come from the process-wide registry and load on the first frame. Only the detector is
+# serialized (detector_lock); alignment, FaceNet inference and gallery matching run unlocked so workers still overlap.
+
+_gallery = None
+_gallery_lock = threading.Lock()
+
+
+def get_gallery():
+    """The process's hot-reloaded face gallery, loaded on first use rather than at import"""
+    global _gallery
+    if _gallery is None:
+        with _gallery_lock:
+            if _gallery is None:
+                gallery = FaceGallery()
+                gallery.watch()
+                _gallery = gallery
+    return _gallery
+
+
+def crop_faces(frame, boxes, keypoints):
+    """Align and preprocess the faces at `boxes` for FaceNet, using detector landmarks when present"""
+    return [preprocess_face(face) for face in align_faces(frame, boxes, keypoints)]
+
+
+def recognize_frames(items):
+    """Detect, track, embed and identify faces for a batch of (frame, tracker, settings) items,
+    possibly from different cameras.
+
+    Each camera's DetectionSettings shrink the detector input (ROI crop, mask, downscale);
+    boxes come back in full-frame pixels and faces are aligned from the full-resolution frame.
+    Only faces whose track needs (re-)recognition are cropped and embedded; the
+    others reuse their track's cached identity. Returns one list of detection
+    dicts ({"box", "track_id", "label", "person_id", "name", ...}) per item.
+    """
+    inputs = [settings.prepare(frame) for frame, _, settings in items]
+    with detector_lock:
+        results = get_detector()([image for image, _ in inputs], verbose=False)
+
+    frame_tracks, pending, faces = [], [], []
+    for (frame, tracker, settings), (_, transform), result in zip(items, inputs, results):
+        height, width = frame.shape[:2]
+        detected_boxes, detected_keypoints = settings.to_frame(
+            result.boxes.xyxy.cpu().numpy(), detection_keypoints(result), transform)
+        boxes, keypoints = [], []
+        for i, box in enumerate(detected_boxes):
+            x1, y1, x2, y2 = map(int, box)
+            x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2, width), min(y2, height)
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2, y2))
+                keypoints.append(detected_keypoints[i] if detected_keypoints is not None else None)
+
+        tracks = tracker.update(boxes)
+        frame_tracks.append(tracks)
+        stale = [i for i, track in enumerate(tracks) if track.needs_embedding()]
+        pending.extend(tracks[i] for i in stale)
+        faces.extend(crop_faces(frame, [boxes[i] for i in stale], [keypoints[i] for i in stale]))
+
+    # One FaceNet forward pass and one gallery match for every stale track of every frame
+    if faces:
+        embeddings = encode_batch(get_embedder(), faces)
+        for track, embedding, identity in zip(pending, embeddings, get_gallery().snapshot.identify(embeddings)):
+            track.set_identity(embedding, identity)
+
+    return [
+        [{**track.identity, "box": track.box, "track_id": track.id, "label": track.label} for track in tracks]
+        for tracks in frame_tracks
+    ]
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+
+class RecordingIndex:
+    """Collects which recognized people appear in a camera's recordings, and when.
+
+    `observe()` is fed every detection result. While idle, sightings are only
+    kept for `lookback` seconds (the recorder's pre-roll), so a clip that starts
+    before its trigger also indexes the people seen in that pre-roll.
+    """
+
+    def __init__(self, lookback):
+        self.lookback = lookback
+        self.started_at = None
+        self._seen = {}  # Person id -> [first seen, last seen, sightings] (wall times)
+
+    def observe(self, detections, now):
+        for person_id in {detection["person_id"] for detection in detections if detection.get("person_id") is not None}:
+            seen = self._seen.setdefault(person_id, [now, now, 0])
+            seen[1] = now
+            seen[2] += 1
+        if self.started_at is None and self._seen:
+            horizon = now - timedelta(seconds=self.lookback)
+            self._seen = {person_id: seen for person_id, seen in self._seen.items() if seen[1] >= horizon}
+
+    def start(self, started_at):
+        """A clip began; its first frame is at `started_at` at the earliest (a full pre-roll)"""
+        self.started_at = started_at
+        self._seen = {person_id: [max(first, started_at), last, count]
+                      for person_id, (first, last, count) in self._seen.items() if last >= started_at}
+
+    def finish(self):
+        """End the clip; returns [(person id, first seen, last seen, sightings)] with wall times"""
+        seen = self._seen
+        self.started_at, self._seen = None, {}
+        identities = [
+            (int(person_id), first, last, count)
+            for person_id, (first, last, count) in seen.items()
+            if str(person_id).isdigit()  # Gallery keys are People ids
+        ]
+        return sorted(identities, key=lambda identity: identity[1])
+
+
+def clip_offsets(identities, started_at, ended_at):
+    """Identities seen within a written clip, as (person id, first offset, last offset, sightings) in seconds from its start.
+
+    `started_at` is the clip's actual first frame, which can be later than the
+    full pre-roll assumed by `start()` (e.g. a buffer not yet full).
+    """
+    return [
+        (person_id, max(0.0, (first - started_at).total_seconds()), (min(last, ended_at) - started_at).total_seconds(), count)
+        for person_id, first, last, count in identities
+        if last >= started_at and first <= ended_at
+    ]
@@ -0,0 +1,199 @@
+import os
+import time
+import glob
+import shutil
+import signal
+import threading
+import subprocess
+from concurrent.futures import Future
+from src.app.v1.CameraSources.services.frameDecoder import FFMPEG_PATH
+from src.app.v1.DetectFaces.Services.clipRecorder import ClipRecorder, PRE_ROLL_SECONDS, POST_ROLL_SECONDS
+
+RECORDING_MODE = os.getenv("RECORDING_MODE", "encode").lower()  # "encode" (decoded frames) or "passthrough" (camera packets, RTSP only)
+SEGMENT_SECONDS = int(os.getenv("SEGMENT_SECONDS", "2"))  # Length of the rolling segments clips are cut from
+SEGMENTS_DIR = os.path.join(os.getenv("STORAGE_DIR", "./storage"), "recordings", ".segments")
+CLIP_FINALIZE_TIMEOUT = 30  # Seconds to wait for the segment covering a clip's end
+
+
+class SegmentRecorder:
+    """Records clips by remuxing the camera's own H.264/H.265 packets, without decoding or encoding.
+
+    An FFmpeg subprocess (`-c copy`, segment muxer) keeps writing SEGMENT_SECONDS
+    MPEG-TS segments of the main stream; segments older than the pre-roll are
+    deleted. A clip is the run of segments from `pre_roll` seconds before
+    `start()` to `post_roll` seconds after the last face, concatenated into an MP4
+    (again `-c copy`) by a background thread once its last segment is complete.
+    Clips keep the camera's native frame rate and quality, and cost almost no CPU;
+    their edges are rounded out to segment (keyframe) boundaries.
+
+    Same interface as ClipRecorder, except that it needs no frames (`needs_frames`).
+    """
+
+    needs_frames = False
+
+    def __init__(self, source, name, pre_roll=PRE_ROLL_SECONDS, post_roll=POST_ROLL_SECONDS, segment_seconds=SEGMENT_SECONDS):
+        self.source = source
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.segment_seconds = segment_seconds
+        self.directory = os.path.join(SEGMENTS_DIR, name)
+        self._lock = threading.Lock()
+        self._process = None
+        self._next_index = 0
+        self._clip = None  # [path, start wall time, Future] of the clip being recorded
+        self._pending = []  # (path, start, end, Future) waiting for their last segment
+        self._last_seen = None
+        self._closing = threading.Event()
+        self.clips = 0
+        self.restarts = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        self._spawn()
+        self._thread = threading.Thread(target=self._run, name=f"segment-recorder-{name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def recording(self):
+        return self._clip is not None
+
+    def _spawn(self):
+        cmd = [
+            FFMPEG_PATH, "-hide_banner", "-loglevel", "error",
+            *(["-rtsp_transport", "tcp"] if self.source.startswith("rtsp://") else []),
+            "-i", self.source,
+            "-map", "0:v:0", "-an", "-c", "copy",
+            "-f", "segment", "-segment_time", str(self.segment_seconds), "-reset_timestamps", "1",
+            "-segment_start_number", str(self._next_index),
+            os.path.join(self.directory, "seg_%08d.ts"),
+        ]
+        self._process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+
+    def _segments(self):
+        """Completed segments as (path, start, end) wall times, oldest first; the newest one is still being written"""
+        paths = sorted(glob.glob(os.path.join(self.directory, "seg_*.ts")))
+        if paths:
+            self._next_index = int(os.path.basename(paths[-1])[4:-3]) + 1
+        if self._process is not None and self._process.poll() is None:
+            paths = paths[:-1]
+        segments, previous = [], None
+        for path in paths:
+            try:
+                end = os.path.getmtime(path)
+            except OSError:
+                continue
+            segments.append((path, previous if previous is not None else end - self.segment_seconds, end))
+            previous = end
+        return segments
+
+    def push(self, frame, now):
+        pass
+
+    def start(self, path, now):
+        with self._lock:
+            self._clip = [path, time.time() - self.pre_roll, Future()]
+        self._last_seen = now
+        self.clips += 1
+
+    def keep_alive(self, now):
+        self._last_seen = now
+
+    def should_stop(self, now):
+        return self._clip is not None and now - self._last_seen >= self.post_roll
+
+    def stop(self):
+        """End the current clip; returns a Future resolved with (epoch of its first frame, duration) once the MP4 is written"""
+        with self._lock:
+            path, start, finished = self._clip
+            self._clip = None
+            self._pending.append((path, start, time.time(), finished))
+        return finished
+
+    def _finalize(self, segments, force=False):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for clip in pending:
+            path, start, end, finished = clip
+            if not force and not any(segment_end >= end for _, _, segment_end in segments) and time.time() - end < CLIP_FINALIZE_TIMEOUT:
+                with self._lock:
+                    self._pending.append(clip)  # Its last segment is still being written
+                continue
+            parts = [segment for segment in segments if segment[2] >= start and segment[1] <= end]
+            try:
+                finished.set_result(self._concat(path, parts))
+            except Exception as e:
+                finished.set_exception(e)
+
+    def _concat(self, path, parts):
+        if not parts:
+            raise RuntimeError(f"No camera segments for {path}")
+        listing = f"{path}.txt"
+        with open(listing, "w") as f:
+            f.writelines(f"file '{os.path.abspath(part)}'\n" for part, _, _ in parts)
+        try:
+            result = subprocess.run(
+                [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y", "-f", "concat", "-safe", "0", "-i", listing,
+                 "-c", "copy", "-movflags", "+faststart", path],
+                stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=120,
+            )
+        finally:
+            os.remove(listing)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"ffmpeg exited with {result.returncode}")
+        return parts[0][1], parts[-1][2] - parts[0][1]  # Clips snap to segment boundaries
+
+    def _prune(self, segments):
+        """Delete segments no clip can still use"""
+        with self._lock:
+            starts = [start for _, start, _, _ in self._pending] + ([self._clip[1]] if self._clip else [])
+        keep_after = min(starts + [time.time() - self.pre_roll - self.segment_seconds])
+        for path, _, end in segments:
+            if end < keep_after:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _run(self):
+        while not self._closing.wait(1):
+            if self._process.poll() is not None:
+                print(f"⚠️ Segment recorder for {self.source} exited, restarting it")
+                self._segments()  # Continue the numbering after the last segment
+                self._spawn()
+                self.restarts += 1
+                self._closing.wait(self.segment_seconds)
+            segments = self._segments()
+            self._finalize(segments)
+            self._prune(segments)
+
+    def close(self):
+        """Stop FFmpeg (closing its last segment cleanly), write any pending clips and remove the segments"""
+        self._closing.set()
+        self._thread.join()
+        if self._process.poll() is None:
+            self._process.send_signal(signal.SIGINT)
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        self._finalize(self._segments(), force=True)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self):
+        return {
+            "mode": "passthrough",
+            "recording": self.recording,
+            "segments": len(glob.glob(os.path.join(self.directory, "seg_*.ts"))),
+            "pending": len(self._pending),
+            "clips": self.clips,
+            "restarts": self.restarts,
+        }
+
+
+def open_recorder(source, name, mode=RECORDING_MODE):
+    """Recorder for a camera `source`; passthrough needs a packet stream (RTSP), other sources are re-encoded"""
+    if mode == "passthrough":
+        if str(source).startswith("rtsp://"):
+            return SegmentRecorder(str(source), name)
+        print(f"⚠️ Passthrough recording needs an RTSP source, re-encoding {source}")
+    return ClipRecorder()
@@ -0,0 +1,147 @@
+import os
+import time
+import threading
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+from src.database.db import engine
+
+SIGHTINGS_FLUSH_SIZE = int(os.getenv("SIGHTINGS_FLUSH_SIZE", "500"))  # Buffered rows that trigger a flush
+SIGHTINGS_FLUSH_SECONDS = float(os.getenv("SIGHTINGS_FLUSH_SECONDS", "5"))  # Max age of a buffered row before it is flushed
+SIGHTINGS_MAX_BUFFER = int(os.getenv("SIGHTINGS_MAX_BUFFER", "50000"))  # Rows kept while the database is unreachable; oldest dropped beyond
+SIGHTING_INTERVAL_SECONDS = float(os.getenv("SIGHTING_INTERVAL_SECONDS", "1"))  # A track is logged at most once per interval
+
+
+class SightingBuffer:
+    """Collects rows in memory and writes them with bulk INSERTs from a background thread.
+
+    The detection loops only append to a list; a flush runs when SIGHTINGS_FLUSH_SIZE
+    rows are waiting or the oldest row is SIGHTINGS_FLUSH_SECONDS old, with one
+    executemany per table in a single transaction. Rows of a failed flush are kept
+    (up to SIGHTINGS_MAX_BUFFER) and retried with the next one; a batch the database
+    rejects (IntegrityError) is retried per table and then per row, so only the
+    offending rows are dropped.
+    """
+
+    def __init__(self, flush_size=SIGHTINGS_FLUSH_SIZE, flush_seconds=SIGHTINGS_FLUSH_SECONDS, max_buffer=SIGHTINGS_MAX_BUFFER):
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.max_buffer = max_buffer
+        self._rows = []  # (model, values dict)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="sighting-buffer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Flush what is buffered and stop the thread"""
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._condition.notify()
+        if thread is not None:
+            thread.join()
+
+    def add(self, model, values):
+        """Queue one row of `model` (a SQLModel table class); never blocks on the database"""
+        self.start()
+        with self._condition:
+            self._rows.append((model, values))
+            if len(self._rows) > self.max_buffer:
+                overflow = len(self._rows) - self.max_buffer
+                del self._rows[:overflow]
+                self.dropped += overflow
+            if len(self._rows) >= self.flush_size:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.flush_seconds
+                while not self._stopping and len(self._rows) < self.flush_size and time.monotonic() < deadline:
+                    self._condition.wait(deadline - time.monotonic())
+                rows, self._rows = self._rows, []
+                stopping = self._stopping
+            if rows and not self._flush(rows) and not stopping:
+                time.sleep(self.flush_seconds)  # Database unreachable: back off instead of retrying in a loop
+            if stopping:
+                return
+
+    def _insert(self, model, values):
+        with Session(engine) as session:
+            session.execute(insert(model.__table__), values)
+            session.commit()
+
+    def _flush(self, rows):
+        tables = {}
+        for model, values in rows:
+            tables.setdefault(model, []).append(values)
+        try:
+            with Session(engine) as session:
+                for model, values in tables.items():
+                    session.execute(insert(model.__table__), values)
+                session.commit()
+            self.written += len(rows)
+            return True
+        except IntegrityError:
+            # e.g. a row pointing at a deleted function: find it instead of losing the whole batch
+            return self._flush_isolating(tables)
+        except Exception as e:
+            self.failures += 1
+            print(f"⚠️ Sightings flush failed ({len(rows)} rows kept): {str(e)}")
+            self._requeue(rows)
+            return False
+
+    def _flush_isolating(self, tables):
+        """Insert table by table, then row by row for a table that is rejected; only the rejected rows are dropped"""
+        remaining = [(model, values) for model, rows in tables.items() for values in rows]
+        try:
+            for model, rows in tables.items():
+                try:
+                    self._insert(model, rows)
+                    self.written += len(rows)
+                except IntegrityError:
+                    for values in rows:
+                        try:
+                            self._insert(model, [values])
+                            self.written += 1
+                        except IntegrityError as e:
+                            self.dropped += 1
+                            print(f"⚠️ Sightings row rejected and dropped: {str(e.orig)}")
+                        remaining.remove((model, values))
+                    continue
+                remaining = [(other, values) for other, values in remaining if other is not model]
+            return True
+        except Exception as e:
+            self.failures += 1
+            print(f"⚠️ Sightings flush failed ({len(remaining)} rows kept): {str(e)}")
+            self._requeue(remaining)
+            return False
+
+    def _requeue(self, rows):
+        with self._condition:
+            self._rows[:0] = rows
+            if len(self._rows) > self.max_buffer:
+                overflow = len(self._rows) - self.max_buffer
+                del self._rows[:overflow]
+                self.dropped += overflow
+
+    def stats(self):
+        return {
+            "buffered": len(self._rows),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+sighting_buffer = SightingBuffer()
@@ -1,54 +1,15 @@
 import os
 import cv2
-import torch
-import pickle
-from facenet_pytorch import InceptionResnetV1
-from ultralytics import YOLO
-import numpy as np
-import mediapipe as mp
+from src.app.v1.DetectFaces.Services.faceEncoder import preprocess_face, encode_batch
+from src.app.v1.DetectFaces.Services.modelRegistry import get_detector, get_embedder, detector_lock
+from src.app.v1.DetectFaces.Services.faceAlignment import align_faces, detection_keypoints, ALIGNMENT_VERSION
+from src.app.v1.DetectFaces.Services.galleryStore import Gallery, load_gallery, publish_gallery
+from src.app.v1.DetectFaces.Services.annIndex import IVFIndex, ANN_ENABLED, ANN_MIN_GALLERY, ANN_INDEX_FILE
 
 USER_STORAGE_DIR = f"{os.getenv('STORAGE_DIR', './storage')}/users/"
 MODELS_DIR = f"{os.getenv('STORAGE_DIR', './storage')}/models/"
 LABELS_FILE = os.path.join(USER_STORAGE_DIR, "labels.txt")
 
-### Load YOLOv8 model for face detection
-face_detector = YOLO('yolov8n-face.pt')
-
-### Load FaceNet model for face recognition
-resnet = InceptionResnetV1(pretrained='vggface2').eval()
-
-### Load Mediapipe for face alignment
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=10, min_detection_confidence=0.5)
-
-# Helper function to encode faces
-def encode(img):
-    img = torch.Tensor(img).unsqueeze(0)  # Add batch dimension
-    if img.shape[1] != 3:  # Ensure the image is in (C, H, W) format
-        img = img.permute(0, 3, 1, 2)
-    res = resnet(img)
-    return res
-
-# Helper function to align faces using Mediapipe landmarks
-def align_face(image, landmarks, image_width, image_height):
-    left_eye = landmarks[159]
-    right_eye = landmarks[386]
-    left_eye_x = int(left_eye.x * image_width)
-    left_eye_y = int(left_eye.y * image_height)
-    right_eye_x = int(right_eye.x * image_width)
-    right_eye_y = int(right_eye.y * image_height)
-    
-    dY = right_eye_y - left_eye_y
-    dX = right_eye_x - left_eye_x
-    angle = np.degrees(np.arctan2(dY, dX)) - 180
-    
-    (h, w) = image.shape[:2]
-    center = (w // 2, h // 2)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-    aligned_face = cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_CUBIC)
-    
-    return aligned_face
-
 # Function to extract frames from video
 def extract_frames(video_path, frame_interval=10):
     frames = []
@@ -73,71 +34,98 @@ def get_labels():
                 if len(parts) == 3:
                     labels.append((parts[0], parts[1], parts[2]))  # (folder_name, name, image_url)
     return labels
-# Train function to process photos and videos and save embeddings
-def TrainFaces():
+
+# Helper function to detect, align and preprocess every face in an image
+def extract_faces(img):
+    faces = []
+    # Shares the detector of the camera workers in this process
+    with detector_lock:
+        results = get_detector()(img, verbose=False)
+    for result in results:
+        boxes = [tuple(map(int, box)) for box in result.boxes.xyxy.cpu().numpy()]
+        faces.extend(preprocess_face(face) for face in align_faces(img, boxes, detection_keypoints(result)))
+    return faces
+
+# Fingerprint of the enrollment media of a person, used to skip unchanged people
+def media_fingerprint(person_folder):
+    fingerprint = []
+    for file_name in ("profile.jpeg", "video.mp4"):
+        path = os.path.join(person_folder, file_name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            fingerprint.append([file_name, stat.st_mtime_ns, stat.st_size])
+    # Embeddings from another alignment method or embedder precision are not comparable,
+    # so a change re-embeds everyone
+    fingerprint.append(["alignment", ALIGNMENT_VERSION])
+    fingerprint.append(["embedder", get_embedder().precision])
+    return fingerprint
+
+def embed_person(person_folder):
+    faces = []
+    
+    image_path = os.path.join(person_folder, "profile.jpeg")
+    if os.path.exists(image_path):
+        img = cv2.imread(image_path)
+        if img is not None:
+            faces.extend(extract_faces(img))
+    
+    # Process video
+    video_path = os.path.join(person_folder, "video.mp4")
+    if os.path.exists(video_path):
+        for frame in extract_frames(video_path, frame_interval=10):
+            faces.extend(extract_faces(frame))
+    
+    # Embed all of this person's faces in batched forward passes
+    return list(encode_batch(get_embedder(), faces))
+
+# Train function to process photos and videos and save embeddings.
+# By default only people added or changed since the last build are embedded;
+# pass full=True to re-embed everyone.
+def TrainFaces(full: bool = False):
+    previous_faces = {} if full else load_gallery().to_people_faces()
     all_people_faces = {}
     labels = get_labels()
+    added, updated, reused = 0, 0, 0
     
     for folder_name, person_name, image_url in labels:
         person_folder = os.path.join(USER_STORAGE_DIR, folder_name)
         if os.path.isdir(person_folder):
-            all_people_faces[person_name] = {"image_url": image_url, "embeddings": []}
+            fingerprint = media_fingerprint(person_folder)
+            previous = previous_faces.get(folder_name)
             
-            image_path = os.path.join(person_folder, "profile.jpeg")
+            if previous is not None and previous.get("fingerprint") == fingerprint:
+                embeddings = previous["embeddings"]
+                reused += 1
+            else:
+                embeddings = embed_person(person_folder)
+                if previous is None:
+                    added += 1
+                else:
+                    updated += 1
             
-            if os.path.exists(image_path):
-                img = cv2.imread(image_path)
-                if img is not None:
-                    results = face_detector(img)
-                    for result in results:
-                        boxes = result.boxes.xyxy.cpu().numpy()
-                        for box in boxes:
-                            x1, y1, x2, y2 = map(int, box)
-                            face = img[y1:y2, x1:x2]
-                            
-                            rgb_face = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
-                            results_mesh = face_mesh.process(rgb_face)
-                            if results_mesh.multi_face_landmarks:
-                                landmarks = results_mesh.multi_face_landmarks[0].landmark
-                                face = align_face(face, landmarks, face.shape[1], face.shape[0])
-                            
-                            face = cv2.resize(face, (160, 160))
-                            face = np.transpose(face, (2, 0, 1))
-                            face = (face / 255.0 - 0.5) / 0.5
-                            
-                            encoded_face = encode(face)
-                            all_people_faces[person_name]["embeddings"].append(encoded_face.detach().numpy().flatten())
+            # Galleries are keyed by People id; the name is kept for display
+            all_people_faces[folder_name] = {
+                "name": person_name,
+                "image_url": image_url,
+                "embeddings": embeddings,
+                "fingerprint": fingerprint,
+            }
 
-    
-            
-            # Process video
-            video_path = os.path.join(person_folder, "video.mp4")
-            if os.path.exists(video_path):
-                frames = extract_frames(video_path, frame_interval=10)
-                for frame in frames:
-                    results = face_detector(frame)
-                    for result in results:
-                        boxes = result.boxes.xyxy.cpu().numpy()
-                        for box in boxes:
-                            x1, y1, x2, y2 = map(int, box)
-                            face = frame[y1:y2, x1:x2]
-                            
-                            rgb_face = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
-                            results_mesh = face_mesh.process(rgb_face)
-                            if results_mesh.multi_face_landmarks:
-                                landmarks = results_mesh.multi_face_landmarks[0].landmark
-                                face = align_face(face, landmarks, face.shape[1], face.shape[0])
-                            
-                            face = cv2.resize(face, (160, 160))
-                            face = np.transpose(face, (2, 0, 1))
-                            face = (face / 255.0 - 0.5) / 0.5
-                            
-                            encoded_face = encode(face)
-                            all_people_faces[person_name].append(encoded_face.detach().numpy().flatten())
+    removed = len(set(previous_faces) - set(all_people_faces))
+    print(f"Trained faces: {added} added, {updated} updated, {reused} unchanged, {removed} removed")
+
+    # Build the approximate index FaceRecognition uses for large galleries.
+    # It is written before the gallery so running workers never see a gallery without its index.
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    gallery = Gallery.from_people_faces(all_people_faces)
+    matcher = gallery.matcher()
+    if ANN_ENABLED and len(matcher.embeddings) >= ANN_MIN_GALLERY:
+        IVFIndex.build(matcher).save(MODELS_DIR + ANN_INDEX_FILE)
+
+    # Publish the gallery atomically; running detection loops pick it up on their own
+    publish_gallery(gallery, MODELS_DIR)
 
-    # Save embeddings to a pickle file
-    with open(MODELS_DIR + "allFaces.pkl", 'wb') as f:
-        pickle.dump(all_people_faces, f)
+    return {"added": added, "updated": updated, "unchanged": reused, "removed": removed}
 
 if __name__ == "__main__":
     TrainFaces()
\ No newline at end of file
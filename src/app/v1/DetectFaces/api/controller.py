@@ -1,71 +1,48 @@
 import os
-import cv2
-import numpy as np
 import asyncio
-import pickle
-import torch
-import pika, json
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from typing import List
-from scipy.spatial.distance import cosine
-from ultralytics import YOLO
-from facenet_pytorch import InceptionResnetV1
-from collections import deque, Counter
-from src.app.v1.Functions.models.models import FunctionInfo
-import mediapipe as mp
-from datetime import datetime
-from src.database.db import get_session
+from src.app.v1.Functions.models.models import FunctionInfo, Sightings
+from datetime import datetime, timedelta
+from src.database.db import get_session, engine
 from sqlalchemy.orm import Session
-from src.app.v1.StorageOperations.models.models import FunctionRecordings
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from src.app.v1.People.models.users_models import People
+from src.app.v1.StorageOperations.models.models import FunctionRecordings, RecordingIdentities
+from src.app.v1.StorageOperations.services.thumbnails import schedule_previews
 from .notificationController import notifier
+from ..Services.recognitionPipeline import recognize_frames, get_gallery
+from ..Services.inferenceScheduler import InferenceScheduler
+from ..Services.processPool import ProcessInferencePool, INFERENCE_MODE
+from ..Services.faceTracker import FaceTracker
+from ..Services.motionGate import MotionGate
+from ..Services.segmentRecorder import open_recorder, SEGMENT_SECONDS
+from ..Services.recordingIndex import RecordingIndex, clip_offsets
+from ..Services.sightingBuffer import sighting_buffer, SIGHTING_INTERVAL_SECONDS
+from ..Services.boundedCache import BoundedCache
+from ..Services.modelRegistry import models
+from src.app.v1.CameraSources.services.cameraReader import open_camera, close_camera
+from src.app.v1.CameraSources.services.detectionSettings import DetectionSettings, find_camera, camera_label
+from src.app.v1.CameraSources.models.camera_sources import CameraSources
 
 VOTE_WINDOW = 10
-FRAME_SKIP = 3
 MODELS_DIR = f"{os.getenv('STORAGE_DIR', './storage')}/models/"
 SessionLocal = get_session()
 
-face_detector = YOLO("yolov8n-face.pt")
-resnet = InceptionResnetV1(pretrained='vggface2').eval()
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(static_image_mode=False, max_num_faces=10, min_detection_confidence=0.5)
-
-face_vote_memory = {}
-
-
-# RabbitMQ Connection
-rabbitmq_host = os.getenv("RABBITMQ_HOST", "localhost")
-
-rabbitmq_connection = pika.BlockingConnection(pika.ConnectionParameters(host="localhost"))
-rabbitmq_channel = rabbitmq_connection.channel()
-rabbitmq_channel.queue_declare(queue="notificationsAlerts")
-
-def load_face_embeddings():
-    with open(MODELS_DIR + 'allFaces.pkl', 'rb') as f:
-        return pickle.load(f)
-
-def encode(img):
-    img = torch.Tensor(img).unsqueeze(0)
-    if img.shape[1] != 3:
-        img = img.permute(0, 3, 1, 2)
-    return resnet(img)
-
-def align_face(image, landmarks, image_width, image_height):
-    left_eye = landmarks[159]
-    right_eye = landmarks[386]
-    left_eye_x, left_eye_y = int(left_eye.x * image_width), int(left_eye.y * image_height)
-    right_eye_x, right_eye_y = int(right_eye.x * image_width), int(right_eye.y * image_height)
-    
-    dY, dX = right_eye_y - left_eye_y, right_eye_x - left_eye_x
-    angle = np.degrees(np.arctan2(dY, dX)) - 180
-    
-    center = (image.shape[1] // 2, image.shape[0] // 2)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
-    return cv2.warpAffine(image, M, (image.shape[1], image.shape[0]), flags=cv2.INTER_CUBIC)
-
 class FaceRecognition:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
-        self.all_people_faces = load_face_embeddings()
+
+    @property
+    def gallery(self):
+        """The hot-reloaded face gallery of this process, loaded on first use"""
+        return get_gallery()
+
+    def identify(self, embeddings):
+        """Match a batch of face embeddings against the current gallery snapshot"""
+        return self.gallery.snapshot.identify(embeddings)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
@@ -80,76 +57,70 @@ class FaceRecognition:
 
 face_recognition = FaceRecognition()
 
+# INFERENCE_MODE=process runs the pipeline in worker processes fed through shared memory;
+# the default runs it in threads of this process
+inference_scheduler = ProcessInferencePool() if INFERENCE_MODE == "process" else InferenceScheduler(recognize_frames)
+active_streams = {}  # Stream name -> (FaceTracker, MotionGate), for the stats endpoint
+
+def ReloadFaceGallery():
+    """Swap in the latest published gallery without restarting the worker"""
+    reloaded = face_recognition.gallery.reload(force=True)
+    snapshot = face_recognition.gallery.snapshot
+    return JSONResponse(content={"reloaded": reloaded, "people": len(snapshot.matcher)}, status_code=200 if reloaded else 500)
+
+def GetDetectionStats():
+    """Model load times and process memory, inference queue counters, per-stream track memory and sampling"""
+    # In process mode the stream's tracks live in an inference process, which reports them with its results
+    streams = {
+        name: {"tracks": inference_scheduler.tracker_stats(tracker) if INFERENCE_MODE == "process" else tracker.stats(),
+               "sampling": gate.stats()}
+        for name, (tracker, gate) in list(active_streams.items())
+    }
+    return JSONResponse(content={"models": models.stats(), "scheduler": inference_scheduler.stats(), "streams": streams,
+                                 "sightings": sighting_buffer.stats()}, status_code=200)
+
 async def DetectFacesWebsocket(websocket: WebSocket):
-    source = websocket.query_params.get("source", "0")
     webcamFeed = f'{os.getenv("STREAMING_SERVER")}api/v1/camera-sources/webcam-video'
-    cap = cv2.VideoCapture(webcamFeed)
+    reader = open_camera(webcamFeed)
 
-    if not cap.isOpened():
+    _, first_frame = await reader.latest_frame()
+    if first_frame is None:
+        close_camera(reader)
         await websocket.send_json({"error": "Unable to open video source."})
         await websocket.close()
         return
 
     await face_recognition.connect(websocket)
-    frame_count = 0
-    stable_identities = {}
+    seq = 0
+    tracker = FaceTracker()
+    gate = MotionGate()
+    settings = DetectionSettings()
+    stream_name = f"websocket-{id(websocket)}"
+    active_streams[stream_name] = (tracker, gate)
+    loop = asyncio.get_running_loop()
 
     try:
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            # Always the newest decoded frame; frames decoded while we were busy are skipped
+            seq, frame = await reader.latest_frame(seq)
+            if frame is None:
                 await websocket.send_json({"error": "Failed to retrieve frame."})
                 break
             
+            if not gate.should_process(frame, loop.time()):
+                continue  # Still scene, sampled at the idle rate
             
-            frame_count += 1
-            if frame_count % FRAME_SKIP != 0:
-                continue
+            detections = await inference_scheduler.submit((frame, tracker, settings))
+            if detections is None:
+                continue  # Inference is saturated, skip this frame
+            if detections:
+                gate.keep_active(loop.time())
             
-            detected_faces = []
-            results = face_detector(frame)
-            
-            for result in results:
-                boxes = result.boxes.xyxy.cpu().numpy()
-                for box in boxes:
-                    x1, y1, x2, y2 = map(int, box)
-                    face = frame[y1:y2, x1:x2]
-                    
-                    rgb_face = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
-                    results_mesh = face_mesh.process(rgb_face)
-                    if results_mesh.multi_face_landmarks:
-                        landmarks = results_mesh.multi_face_landmarks[0].landmark
-                        face = align_face(face, landmarks, face.shape[1], face.shape[0])
-                    
-                    face = cv2.resize(face, (160, 160))
-                    face = np.transpose(face, (2, 0, 1))
-                    face = (face / 255.0 - 0.5) / 0.5
-                    
-                    img_embedding = encode(face).detach().numpy().flatten()
-                    detect_dict = {k: min([cosine(v, img_embedding) for v in data["embeddings"]])
-                                   for k, data in face_recognition.all_people_faces.items() if data["embeddings"]}
-                    
-                    if not detect_dict or min(detect_dict.values()) >= 0.5:
-                        min_key, image_url, value = "Undetected", "N/A", "0.00"
-                    else:
-                        min_key = min(detect_dict, key=detect_dict.get)
-                        image_url = face_recognition.all_people_faces[min_key]["image_url"]
-                        value = face_recognition.all_people_faces[min_key].get("value", "0.00")
-                    
-                    face_id = (x1, y1, x2, y2)
-                    if face_id not in stable_identities:
-                        stable_identities[face_id] = {"label": min_key, "count": 0}
-                    
-                    if stable_identities[face_id]["label"] == min_key:
-                        stable_identities[face_id]["count"] += 1
-                    else:
-                        stable_identities[face_id] = {"label": min_key, "count": 0}
-                    
-                    if stable_identities[face_id]["count"] >= 35:
-                        stable_identities[face_id]["label"] = min_key
-                    
-                    final_label = stable_identities[face_id]["label"]
-                    detected_faces.append({"name": final_label, "image_url": image_url, "value": value})
+            # Labels are voted per track, so they stay stable while a face moves
+            detected_faces = [
+                {"name": detection["label"], "image_url": detection["image_url"], "value": detection["value"]}
+                for detection in detections
+            ]
             
             # Send the updated detected faces list instead of appending
             await websocket.send_json({"detected_faces": detected_faces})
@@ -159,7 +130,8 @@ async def DetectFacesWebsocket(websocket: WebSocket):
         print("Client disconnected.")
     finally:
         face_recognition.disconnect(websocket)
-        cap.release()
+        active_streams.pop(stream_name, None)
+        close_camera(reader)
 
 
 async def DetectFacesBackground(func, session: Session):
@@ -168,71 +140,83 @@ async def DetectFacesBackground(func, session: Session):
     if source == "0" or source == []:
         source = f'{os.getenv("STREAMING_SERVER")}api/v1/camera-sources/webcam-video'
 
-    cap = cv2.VideoCapture(source)
-    if not cap.isOpened():
-        print(f"Error: Unable to open video source for function {func.name}")
-        return
-
-    frame_count = 0
+    stream_name = f"function-{func.id}"
+    reader = recording_reader = recorder = None
+    recording_index = None
     people_detected_start = None
-    recording_start_time = None
-    recording = False
-    out = None
+    recording_people = 0
+    pending_saves = []
     people_count_log = []
     file_path = None
 
     FPS = 10  # Set a stable FPS to prevent fast playback
     last_notification_time = 0
     
+    loop = asyncio.get_running_loop()
     try:
+        # Everything that opens a resource runs inside the try, so the finally block releases whatever was opened
+        camera_sources = session.query(CameraSources).all()
+        camera = find_camera(camera_sources, source)
+        camera_name = camera_label(camera_sources, source)  # Stream URLs carry the camera credentials
+        # Detect on the camera's low-resolution sub-stream when it has one; recordings use the main stream
+        detection_source = (camera or {}).get("detectionUrl") or source
+        reader = open_camera(detection_source)
+        _, first_frame = await reader.latest_frame()
+        if first_frame is None:
+            print(f"Error: Unable to open video source for function {func.name}")
+            return
+
+        seq = 0
+        tracker = FaceTracker()
+        gate = MotionGate(func.idleSampleRate, func.activeSampleRate)
+        settings = DetectionSettings.from_camera(camera)
+        logged_tracks = BoundedCache(1024, 60)  # Track id -> loop time it was last written to the sightings log
+        active_streams[stream_name] = (tracker, gate)
+        recorder = open_recorder(source, f"function-{func.id}") if func.saveRecordings else None
+        # Sightings are kept a segment longer than the pre-roll: passthrough clips round their start down to a segment
+        recording_index = RecordingIndex(recorder.pre_roll + SEGMENT_SECONDS) if recorder else None
+        if recorder and recorder.needs_frames and recorder.pre_roll and detection_source != source:
+            recording_reader = open_camera(source)  # Pre-roll needs the main stream decoded all the time
+
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            seq, frame = await reader.latest_frame(seq)
+            if frame is None:
                 break
 
-            frame_count += 1
-            if frame_count % FRAME_SKIP != 0:
-                continue
-
-            detected_faces = []
-            results = face_detector(frame)
-            
-            for result in results:
-                boxes = result.boxes.xyxy.cpu().numpy()
-                for box in boxes:
-                    x1, y1, x2, y2 = map(int, box)
-                    face = frame[y1:y2, x1:x2]
-                    
-                    rgb_face = cv2.cvtColor(face, cv2.COLOR_BGR2RGB)  # Convert before processing
-                    results_mesh = face_mesh.process(rgb_face)
-                    if results_mesh.multi_face_landmarks:
-                        landmarks = results_mesh.multi_face_landmarks[0].landmark
-                        face = align_face(face, landmarks, face.shape[1], face.shape[0])
-                    
-                    face = cv2.resize(face, (160, 160))
-                    face = np.transpose(face, (2, 0, 1))
-                    face = (face / 255.0 - 0.5) / 0.5
-
-                    img_embedding = encode(face).detach().numpy().flatten()
-                    detect_dict = {k: min([cosine(v, img_embedding) for v in data["embeddings"]])
-                                   for k, data in face_recognition.all_people_faces.items() if data["embeddings"]}
-
-                    if not detect_dict or min(detect_dict.values()) >= 0.5:
-                        min_key, image_url, value = "Undetected", "N/A", "0.00"
-                    else:
-                        min_key = min(detect_dict, key=detect_dict.get)
-                        image_url = face_recognition.all_people_faces[min_key]["image_url"]
-                        value = face_recognition.all_people_faces[min_key].get("value", "0.00")
-
-                    detected_faces.append({"name": min_key, "image_url": image_url, "value": value})
+            if recorder and recorder.needs_frames:
+                # Every frame goes to the recorder (pre-roll or live clip), including the ones the gate skips
+                record_frame = frame
+                if recording_reader:
+                    _, record_frame = await recording_reader.latest_frame()
+                if record_frame is not None:
+                    recorder.push(record_frame, loop.time())
+
+            if not gate.should_process(frame, loop.time()):
+                continue  # Still scene, sampled at the idle rate
+
+            detections = await inference_scheduler.submit((frame, tracker, settings))
+            if detections is None:
+                continue  # Inference is saturated, skip this frame
+            if detections:
+                gate.keep_active(loop.time())  # Faces in view: stay at the active rate even if they stand still
+            if recording_index:
+                recording_index.observe(detections, datetime.now())
+            log_sightings(func, camera_name, detections, logged_tracks, loop.time())
+
+            detected_faces = [
+                {"name": detection["label"], "image_url": detection["image_url"], "value": detection["value"]}
+                for detection in detections
+            ]
 
             people_count = len(detected_faces)
-            loop = asyncio.get_running_loop()
             current_time = loop.time()
 
             if people_count >= 1:
                 if people_detected_start is None:
                     people_detected_start = current_time
+                if recorder and recorder.recording:
+                    recorder.keep_alive(current_time)
+                    recording_people = max(recording_people, people_count)
 
                 if current_time - people_detected_start >= 7:
                     if func.notify and (current_time - last_notification_time >= 10):
@@ -243,71 +227,136 @@ async def DetectFacesBackground(func, session: Session):
                             await notifier.push(
                                 {"timestamp": int(current_time), "people_count": people_count, "message": f"{func.name} Function has detected {people_count} people."}
                             )
-                            #rabbitmq_channel.basic_publish(exchange="", routing_key="notificationsAlerts", body=message)
                             last_notification_time = current_time
                             print(f"📢 Notification sent at {datetime.now().isoformat()}")
                         except Exception as e:
                             print("RabbitMQ Error:", str(e))
 
-                    if func.saveRecordings and not recording:
+                    if recorder and not recorder.recording:
                         file_name = f"{func.name}_{int(datetime.now().timestamp())}.mp4"
                         file_path = os.path.abspath(os.path.join("storage", "recordings", file_name))
                         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                        
-                        if frame.shape[0] > 0 and frame.shape[1] > 0:
-                            height, width, _ = frame.shape
-                            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-                            out = cv2.VideoWriter(file_path, fourcc, FPS, (width, height))
-                            recording = True
-                            recording_start_time = current_time
-                            print(f"🔴 Recording started: {file_path}")
-                        else:
-                            print("⚠️ Frame size invalid. Skipping recording.")
-
-                if recording and out and out.isOpened():
-                    frame_bgr = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # Fix color issue
-                    out.write(frame_bgr)
+                        if recorder.needs_frames and detection_source != source and recording_reader is None:
+                            recording_reader = open_camera(source)  # Main stream, decoded only while recording
+                        recorder.start(file_path, current_time)
+                        recording_index.start(datetime.now() - timedelta(seconds=recording_index.lookback))
+                        recording_people = people_count
+                        print(f"🔴 Recording started: {file_path}")
 
             else:
-                if recording:
-                    if recording_start_time and current_time - recording_start_time >= 5:
-                        print(f"🛑 Stopping recording: {file_path}")
-                        out.release()
-                        recording = False
-                        out = None
-                        recording_start_time = None
-
-                        # Save to DB
-                        new_recording = FunctionRecordings(
-                            function_id=func.id,
-                            timestamp=datetime.now().isoformat(),
-                            recording=file_path,
-                            people_count=people_count,
-                            created_at=datetime.now()
-                        )
-                        try:
-                            loop.run_in_executor(None, lambda: session.add(new_recording))
-                            loop.run_in_executor(None, lambda: session.commit())
-                            print(f"✅ Recording saved in DB: {file_path}")
-                        except Exception as e:
-                            print(f"⚠️ DB Save Error: {str(e)}")
+                if recorder and recorder.should_stop(current_time):
+                    print(f"🛑 Stopping recording: {file_path}")
+                    pending_saves.append(loop.create_task(save_recording(
+                        func, file_path, recording_people, recorder.stop(), recording_index.finish())))
+                    if recording_reader and not recorder.pre_roll:
+                        close_camera(recording_reader)
+                        recording_reader = None
 
                 people_detected_start = None
 
             people_count_log.append(people_count)
             if len(people_count_log) >= 10 * 60 / 5:
                 avg_count = sum(people_count_log) / len(people_count_log)
-                new_info = FunctionInfo(function_id=func.id, timestamp=datetime.now(), avg_people_count=avg_count)
-                session.add(new_info)
-                session.commit()
+                sighting_buffer.add(FunctionInfo, {"function_id": func.id, "timestamp": datetime.now(), "avg_people_count": round(avg_count)})
                 people_count_log.clear()
+                print(f"📊 {func.name} tracks: {tracker.stats()}, sampling: {gate.stats()}"
+                      + (f", recording: {recorder.stats()}" if recorder else ""))
 
             await asyncio.sleep(1 / FPS)  # Maintain stable FPS
 
     except Exception as e:
         print(f"Error in face detection: {str(e)}")
     finally:
-        if out:
+        if recorder and recorder.recording:
             print(f"🛑 Stopping recording: {file_path}")
-            out.release()
-        cap.release()
\ No newline at end of file
+            pending_saves.append(loop.create_task(save_recording(
+                func, file_path, recording_people, recorder.stop(), recording_index.finish())))
+        if recorder:
+            try:
+                await loop.run_in_executor(None, recorder.close)
+            except Exception as e:
+                print(f"⚠️ Unable to close recorder: {str(e)}")
+        # Let the clips being written reach the database before the loop is gone
+        await asyncio.gather(*pending_saves, return_exceptions=True)
+        active_streams.pop(stream_name, None)
+        if recording_reader:
+            close_camera(recording_reader)
+        if reader:
+            close_camera(reader)
+
+
+def log_sightings(func, camera, detections, logged_tracks, now):
+    """Queue a Sightings row per face, at most once per SIGHTING_INTERVAL_SECONDS for each track"""
+    logged_tracks.expire()
+    timestamp = datetime.now()
+    for detection in detections:
+        last_logged = logged_tracks.get(detection["track_id"])
+        if last_logged is not None and now - last_logged < SIGHTING_INTERVAL_SECONDS:
+            continue
+        logged_tracks[detection["track_id"]] = now
+        person_id = detection.get("person_id")
+        known = person_id is not None and str(person_id).isdigit()
+        x1, y1, x2, y2 = map(int, detection["box"])
+        sighting_buffer.add(Sightings, {
+            "function_id": func.id,
+            "camera": camera[:255],
+            "person_id": int(person_id) if known else None,
+            "track_id": int(detection["track_id"]),
+            "confidence": max(0.0, 1.0 - float(detection.get("distance", 1.0))) if known else 0.0,
+            "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+            "timestamp": timestamp,
+        })
+
+
+async def save_recording(func, file_path, people_count, finished, identities):
+    """Store a FunctionRecordings row and its RecordingIdentities index once the clip writer has closed the file"""
+    try:
+        # The recorder reports where the clip really starts (partial pre-roll, segment boundaries)
+        first_frame, duration = await asyncio.wrap_future(finished)
+        started_at = datetime.fromtimestamp(first_frame)
+        ended_at = started_at + timedelta(seconds=duration)
+    except Exception as e:
+        print(f"⚠️ Recording failed: {file_path}: {str(e)}")
+        return
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            None, store_recording, func.id, file_path, people_count, started_at, ended_at, clip_offsets(identities, started_at, ended_at))
+        print(f"✅ Recording saved in DB: {file_path} ({duration:.0f}s)")
+    except Exception as e:
+        print(f"⚠️ DB Save Error: {str(e)}")
+    schedule_previews(file_path)
+
+
+def store_recording(function_id, file_path, people_count, started_at, ended_at, identities):
+    """Write the recording row, then its identities; runs in a worker thread with its own session.
+
+    The recording is committed on its own so identities that fail cannot lose it:
+    the gallery keeps people deleted since the last /train, so only ids still in
+    People are indexed, and a person deleted in between only drops the index.
+    """
+    with Session(engine) as session:
+        recording = FunctionRecordings(
+            function_id=function_id,
+            timestamp=datetime.now().isoformat(),
+            recording=file_path,
+            people_count=people_count,
+            started_at=started_at,
+            ended_at=ended_at,
+            created_at=datetime.now()
+        )
+        session.add(recording)
+        session.commit()
+        if not identities:
+            return
+        recording_id = recording.id
+        existing = set(session.execute(select(People.id).where(People.id.in_({identity[0] for identity in identities}))).scalars())
+        session.add_all(
+            RecordingIdentities(recording_id=recording_id, person_id=person_id, first_seen=first_seen, last_seen=last_seen, sightings=sightings)
+            for person_id, first_seen, last_seen, sightings in identities
+            if person_id in existing
+        )
+        try:
+            session.commit()
+        except IntegrityError as e:
+            session.rollback()
+            print(f"⚠️ Recording identities of {file_path} not indexed: {str(e.orig)}")
@@ -1,16 +1,9 @@
 from fastapi import APIRouter
-from src.app.v1.DetectFaces.api.controller import *
+from src.config.variables import APP_ROLE, INFERENCE_ROLES
 from src.app.v1.DetectFaces.api.notificationController import *
-from src.app.v1.DetectFaces.Services.trainFaces import *
 router = APIRouter()
 
 webSocketRoutes = [
-    {
-        "route": "/stream",
-        "method": ["WEBSOCKET"],
-        "handler": DetectFacesWebsocket,
-        "name": "WebSocket Face Detection"
-    },
     {
         "route": "/notifications",
         "method": ["WEBSOCKET"],
@@ -20,12 +13,6 @@ webSocketRoutes = [
 ]
 
 restRoutes = [
-    {
-        "route": "/train",
-        "method": ["POST"],
-        "handler": TrainFaces,
-        "name": "Train Faces"
-    },
     {
         "route": "/send-notification",
         "method": ["POST"],
@@ -34,6 +21,41 @@ restRoutes = [
     }
 ]
 
+# The inference stack is only imported by processes that serve it (see APP_ROLE)
+if APP_ROLE in INFERENCE_ROLES:
+    from src.app.v1.DetectFaces.api.controller import *
+    from src.app.v1.DetectFaces.Services.trainFaces import *
+
+    webSocketRoutes += [
+        {
+            "route": "/stream",
+            "method": ["WEBSOCKET"],
+            "handler": DetectFacesWebsocket,
+            "name": "WebSocket Face Detection"
+        }
+    ]
+
+    restRoutes += [
+        {
+            "route": "/train",
+            "method": ["POST"],
+            "handler": TrainFaces,
+            "name": "Train Faces"
+        },
+        {
+            "route": "/reload",
+            "method": ["POST"],
+            "handler": ReloadFaceGallery,
+            "name": "Reload Face Gallery"
+        },
+        {
+            "route": "/stats",
+            "method": ["GET"],
+            "handler": GetDetectionStats,
+            "name": "Detection Stats"
+        }
+    ]
+
 for route in restRoutes:
     router.add_api_route(route["route"], route["handler"], methods=route["method"], name=route["name"])
     
@@ -5,15 +5,54 @@ from sqlmodel import Session, select
 from typing import Annotated
 from src.app.v1.Functions.models.models import *
 from src.app.v1.StorageOperations.models.models import *
+from src.app.v1.People.models.users_models import People
+from sqlalchemy import func
 from sqlalchemy.sql.expression import cast
 from sqlalchemy.types import String
 from ..schemas import *
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
+def iso(value):
+    return value.isoformat() if value else None
+
+
+def recordings_data(session: Session, recordings):
+    """Serialize recordings with the people indexed in each one (RecordingIdentities)"""
+    identities = {}
+    if recordings:
+        rows = session.exec(
+            select(RecordingIdentities, People.name)
+            .join(People, People.id == RecordingIdentities.person_id, isouter=True)
+            .where(RecordingIdentities.recording_id.in_([recording.id for recording in recordings]))
+            .order_by(RecordingIdentities.first_seen)
+        ).all()
+        for identity, name in rows:
+            identities.setdefault(identity.recording_id, []).append({
+                "person_id": identity.person_id,
+                "name": name,
+                "first_seen": identity.first_seen,
+                "last_seen": identity.last_seen,
+                "sightings": identity.sightings,
+            })
+
+    return [
+        {
+            **recording.model_dump(),
+            "created_at": iso(recording.created_at),  # Convert datetime to string
+            "started_at": iso(recording.started_at),
+            "ended_at": iso(recording.ended_at),
+            "identities": identities.get(recording.id, []),
+        }
+        for recording in recordings
+    ]
+
+
 def GetFunctionRecordings(
     functionId: int,
-    session: SessionDep
+    session: SessionDep,
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 100,
 ) -> JSONResponse:
     try:
         print("Function ID: ", functionId)
@@ -23,17 +62,11 @@ def GetFunctionRecordings(
             return JSONResponse(content={"message": "Function not found"}, status_code=404)
         
         print("Function: ", function)
-        recordings = session.exec(select(FunctionRecordings).where(FunctionRecordings.function_id == functionId)).all()
-        
-        recordings_data = [
-            {
-                **recording.model_dump(),
-                "created_at": recording.created_at.isoformat()  # Convert datetime to string
-            }
-            for recording in recordings
-        ]
+        query = select(FunctionRecordings).where(FunctionRecordings.function_id == functionId)
+        total = session.exec(select(func.count()).select_from(query.subquery())).one()
+        recordings = session.exec(query.order_by(FunctionRecordings.id).offset(offset).limit(limit)).all()
         
-        return JSONResponse(content={"result": recordings_data}, status_code=200)
+        return JSONResponse(content={"result": recordings_data(session, recordings), "total": total}, status_code=200)
     
     except Exception as e:
         print(e)
@@ -42,6 +75,124 @@ def GetFunctionRecordings(
     finally:
         session.close()
 
+
+def SearchRecordings(
+    session: SessionDep,
+    personId: Optional[int] = None,
+    functionId: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    offset: int = 0,
+    limit: Annotated[int, Query(le=100)] = 100,
+) -> JSONResponse:
+    """Recordings across functions containing `personId` and overlapping [start, end], newest first"""
+    try:
+        query = select(FunctionRecordings)
+        if personId is not None:
+            query = query.where(FunctionRecordings.id.in_(
+                select(RecordingIdentities.recording_id).where(RecordingIdentities.person_id == personId)))
+        if functionId is not None:
+            query = query.where(FunctionRecordings.function_id == functionId)
+        if start is not None:
+            query = query.where(FunctionRecordings.ended_at >= start)
+        if end is not None:
+            query = query.where(FunctionRecordings.started_at <= end)
+
+        total = session.exec(select(func.count()).select_from(query.subquery())).one()
+        recordings = session.exec(
+            query.order_by(FunctionRecordings.started_at.desc(), FunctionRecordings.id.desc()).offset(offset).limit(limit)
+        ).all()
+
+        return JSONResponse(content={"result": recordings_data(session, recordings), "total": total}, status_code=200)
+
+    except Exception as e:
+        print(e)
+        return JSONResponse(content={"message": "An error occurred while searching the recordings"}, status_code=500)
+
+    finally:
+        session.close()
+
+def sightings_query(query, functionId, personId, start, end):
+    if functionId is not None:
+        query = query.where(Sightings.function_id == functionId)
+    if personId is not None:
+        query = query.where(Sightings.person_id == personId)
+    if start is not None:
+        query = query.where(Sightings.timestamp >= start)
+    if end is not None:
+        query = query.where(Sightings.timestamp <= end)
+    return query
+
+
+def GetSightings(
+    session: SessionDep,
+    functionId: Optional[int] = None,
+    personId: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    offset: int = 0,
+    limit: Annotated[int, Query(le=1000)] = 100,
+) -> JSONResponse:
+    """Sighting events, newest first"""
+    try:
+        query = sightings_query(select(Sightings), functionId, personId, start, end)
+        sightings = session.exec(query.order_by(Sightings.timestamp.desc(), Sightings.id.desc()).offset(offset).limit(limit)).all()
+
+        sightings_data = [
+            {
+                **sighting.model_dump(exclude={"camera"}),
+                "timestamp": sighting.timestamp.isoformat()  # Convert datetime to string
+            }
+            for sighting in sightings
+        ]
+
+        return JSONResponse(content={"result": sightings_data}, status_code=200)
+
+    except Exception as e:
+        print(e)
+        return JSONResponse(content={"message": "An error occurred while fetching the sightings"}, status_code=500)
+
+    finally:
+        session.close()
+
+
+def GetAttendance(
+    session: SessionDep,
+    functionId: Optional[int] = None,
+    personId: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> JSONResponse:
+    """Per person (null for unknown faces): first and last sighting and number of sightings in the range"""
+    try:
+        query = sightings_query(
+            select(Sightings.person_id, People.name, func.min(Sightings.timestamp), func.max(Sightings.timestamp), func.count(Sightings.id))
+            .join(People, People.id == Sightings.person_id, isouter=True),
+            functionId, personId, start, end,
+        ).group_by(Sightings.person_id, People.name)
+        rows = session.exec(query).all()
+
+        attendance = [
+            {
+                "person_id": person_id,
+                "name": name if person_id is not None else "Undetected",
+                "first_seen": first_seen.isoformat(),
+                "last_seen": last_seen.isoformat(),
+                "sightings": count,
+            }
+            for person_id, name, first_seen, last_seen, count in rows
+        ]
+
+        return JSONResponse(content={"result": attendance}, status_code=200)
+
+    except Exception as e:
+        print(e)
+        return JSONResponse(content={"message": "An error occurred while fetching the attendance"}, status_code=500)
+
+    finally:
+        session.close()
+
+
 def AddNewFunction(
     function_data: FunctionsCreateSchema, session: SessionDep
 ) -> JSONResponse:
@@ -54,7 +205,9 @@ def AddNewFunction(
             timeSlot=function_data.timeSlot,
             camerasAssigned=function_data.camerasAssigned,
             saveRecordings=function_data.saveRecordings,
-            notify=function_data.notify
+            notify=function_data.notify,
+            idleSampleRate=function_data.idleSampleRate,
+            activeSampleRate=function_data.activeSampleRate
         )
 
         session.add(function)
@@ -96,7 +249,7 @@ def GetFunctions(
         
 def UpdateFunction(
     functionId: int,
-    updated_data: FunctionsCreateSchema,
+    updated_data: FunctionsUpdateSchema,
     session: SessionDep
 ) -> JSONResponse:
     
@@ -112,6 +265,10 @@ def UpdateFunction(
         function.camerasAssigned = updated_data.camerasAssigned
         function.saveRecordings = updated_data.saveRecordings
         function.notify = updated_data.notify
+        if updated_data.idleSampleRate is not None:
+            function.idleSampleRate = updated_data.idleSampleRate
+        if updated_data.activeSampleRate is not None:
+            function.activeSampleRate = updated_data.activeSampleRate
         
         session.commit()
         session.refresh(function)
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Column, JSON
+from sqlalchemy import Index
 from typing import Optional, Dict
 from datetime import datetime
 
@@ -14,6 +15,8 @@ class Functions(SQLModel, table=True):
     camerasAssigned: Dict = Field(sa_column=Column(JSON))
     saveRecordings: bool = Field(default=False)
     notify: bool = Field(default=False)
+    idleSampleRate: float = Field(default=1.0)  # Frames/sec analyzed while the scene is still
+    activeSampleRate: float = Field(default=10.0)  # Frames/sec analyzed while there is motion or a face
     created_at: datetime = Field(default=datetime.now())
     
     
@@ -24,4 +27,26 @@ class FunctionInfo(SQLModel, table=True):
     id: int = Field(primary_key=True)
     function_id: int = Field(foreign_key="functions.id")
     timestamp: datetime
-    avg_people_count: int
\ No newline at end of file
+    avg_people_count: int
+
+
+class Sightings(SQLModel, table=True):
+    """One face seen by a function's camera: a recognized person (person_id) or an unknown face (NULL)"""
+    
+    __tablename__ = "sightings"
+    __table_args__ = (
+        Index("ix_sightings_function_id_timestamp", "function_id", "timestamp"),
+        Index("ix_sightings_person_id_timestamp", "person_id", "timestamp"),
+    )
+    
+    id: int = Field(primary_key=True)
+    function_id: int = Field(foreign_key="functions.id")
+    camera: str = Field(max_length=255)  # "<camera source id>/<camera name>", never the stream URL (it holds credentials)
+    person_id: Optional[int] = Field(default=None, foreign_key="people.id", ondelete="SET NULL")  # Deleted people become unknown faces
+    track_id: int
+    confidence: float  # 1 - embedding distance to the matched person (0 for unknown faces)
+    x1: int
+    y1: int
+    x2: int
+    y2: int
+    timestamp: datetime
@@ -28,6 +28,24 @@ routes = [
         "handler": UpdateFunction,
         "name": "Update function"
     },
+    {
+        "route": "/sightings",
+        "method": ["GET"],
+        "handler": GetSightings,
+        "name": "Get sightings"
+    },
+    {
+        "route": "/sightings/attendance",
+        "method": ["GET"],
+        "handler": GetAttendance,
+        "name": "Get attendance"
+    },
+    {
+        "route": "/recordings",
+        "method": ["GET"],
+        "handler": SearchRecordings,
+        "name": "Search recordings"
+    },
     {
         "route": "/recordings/{functionId}",
         "method": ["GET"],
@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 class FunctionsCreateSchema(BaseModel):
@@ -10,6 +10,14 @@ class FunctionsCreateSchema(BaseModel):
     camerasAssigned: dict
     saveRecordings: bool
     notify: bool
+    idleSampleRate: float = Field(default=1.0, gt=0)
+    activeSampleRate: float = Field(default=10.0, gt=0)
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class FunctionsUpdateSchema(FunctionsCreateSchema):
+    # Omitted rates keep their stored values instead of falling back to the defaults
+    idleSampleRate: Optional[float] = Field(default=None, gt=0)
+    activeSampleRate: Optional[float] = Field(default=None, gt=0)
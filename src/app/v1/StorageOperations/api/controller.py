@@ -1,13 +1,15 @@
 from dotenv import load_dotenv
 import os
-from fastapi import HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+import time
+from email.utils import parsedate_to_datetime
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from src.app.v1.StorageOperations.models.models import *
+from src.app.v1.StorageOperations.services.thumbnails import preview_paths
 from src.database.db import get_session
 from sqlmodel import Session, select
 from typing import Annotated
 from fastapi import Depends
-import cv2
 
 SessionDep = Annotated[Session, Depends(get_session)]
 
@@ -25,7 +27,11 @@ async def GetUserImage(user_id: str, image_name: str):
     return FileResponse(image_path)
 
 
-async def GetFunctionVideoStream(function_id: str, session: SessionDep):
+async def GetFunctionVideoStream(function_id: str, session: SessionDep, request: Request, format: str = "mp4"):
+    """Serve a recording as a file (Range/206 seeking, ETag and Last-Modified revalidation).
+
+    `format=mjpeg` keeps the old multipart JPEG stream for legacy clients that cannot play MP4.
+    """
     function = session.query(FunctionRecordings).filter(FunctionRecordings.id == function_id).first()
     if not function:
         raise HTTPException(status_code=404, detail="Function not found")
@@ -34,9 +40,61 @@ async def GetFunctionVideoStream(function_id: str, session: SessionDep):
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Video not found")
 
+    if format == "mjpeg":
+        return StreamingResponse(mjpeg_frames(file_path), media_type="multipart/x-mixed-replace; boundary=frame")
+
+    response = FileResponse(file_path, media_type="video/mp4", stat_result=os.stat(file_path),
+                            headers={"Cache-Control": "private, no-cache"})
+    if not_modified(request, response):
+        return Response(status_code=304, headers={name: response.headers[name] for name in ("etag", "last-modified", "cache-control")})
+    return response
+
+
+async def GetFunctionRecordingPreview(recording_id: str, kind: str, session: SessionDep, request: Request):
+    """Serve a recording's poster, sprite sheet or sprite metadata (written in the background when the clip closes)"""
+    recording = session.query(FunctionRecordings).filter(FunctionRecordings.id == recording_id).first()
+    if not recording:
+        raise HTTPException(status_code=404, detail="Recording not found")
+
+    paths = preview_paths(recording.recording)
+    if kind not in paths:
+        raise HTTPException(status_code=404, detail="Unknown preview")
+    if not os.path.exists(paths[kind]):
+        raise HTTPException(status_code=404, detail="Preview not ready")
+
+    # Previews never change once written, but are regenerated under the same name if a clip is reprocessed
+    response = FileResponse(paths[kind], media_type="application/json" if kind == "sprite-info" else "image/jpeg",
+                            stat_result=os.stat(paths[kind]), headers={"Cache-Control": "private, max-age=86400"})
+    if not_modified(request, response):
+        return Response(status_code=304, headers={name: response.headers[name] for name in ("etag", "last-modified", "cache-control")})
+    return response
+
+
+def not_modified(request: Request, response: Response):
+    """True when the client's cached copy (If-None-Match / If-Modified-Since) is still current"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or response.headers["etag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return parsedate_to_datetime(response.headers["last-modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def mjpeg_frames(file_path: str):
+    """Decode a recording into multipart JPEG parts at its own frame rate.
+
+    A plain generator, so StreamingResponse runs the decoding in the threadpool instead of on the event loop.
+    """
+    import cv2  # Imported here so API-only workers never load OpenCV
+
     cap = cv2.VideoCapture(file_path)
-    
-    def generate():
+    interval = 1 / (cap.get(cv2.CAP_PROP_FPS) or 10)
+    try:
         while cap.isOpened():
             ret, frame = cap.read()
             if not ret:
@@ -46,9 +104,6 @@ async def GetFunctionVideoStream(function_id: str, session: SessionDep):
             frame = buffer.tobytes()
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            
-    return StreamingResponse(generate(), media_type="multipart/x-mixed-replace; boundary=frame")
-    
-    
-    
-    
\ No newline at end of file
+            time.sleep(interval)
+    finally:
+        cap.release()
@@ -1,16 +1,20 @@
 from sqlmodel import SQLModel, Field, Column, JSON
+from sqlalchemy import Index
 from typing import Optional, Dict
 from datetime import datetime
 
 class FunctionRecordings(SQLModel, table=True):
     
     __tablename__ = "function_recordings"
+    __table_args__ = (Index("ix_function_recordings_function_id_started_at", "function_id", "started_at"),)
     
     id: int = Field(primary_key=True)
     function_id: int = Field(foreign_key="functions.id")
     timestamp: str
     recording: str
     people_count: int
+    started_at: Optional[datetime] = Field(default=None, index=True)  # Wall time of the first frame (pre-roll included)
+    ended_at: Optional[datetime] = Field(default=None)
     created_at: datetime = Field(default=datetime.now())
     
     def __repr__(self):
@@ -22,4 +26,17 @@ class FunctionRecordings(SQLModel, table=True):
     def __eq__(self, other):
         if not isinstance(other, FunctionRecordings):
             return False
-        return self.id == other.id and self.function_id == other.function_id and self.timestamp == other.timestamp and self.recording == other.recording and self.people_count == other.people_count and self.created_at == other.created_at
\ No newline at end of file
+        return self.id == other.id and self.function_id == other.function_id and self.timestamp == other.timestamp and self.recording == other.recording and self.people_count == other.people_count and self.created_at == other.created_at
+
+
+class RecordingIdentities(SQLModel, table=True):
+    """A recognized person in a recording, with offsets (seconds from the clip start) of their first and last sighting"""
+    
+    __tablename__ = "recording_identities"
+    
+    id: int = Field(primary_key=True)
+    recording_id: int = Field(foreign_key="function_recordings.id", index=True)
+    person_id: int = Field(foreign_key="people.id", index=True, ondelete="CASCADE")  # Deleting a person drops them from the index
+    first_seen: float
+    last_seen: float
+    sightings: int
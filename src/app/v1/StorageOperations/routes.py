@@ -15,6 +15,12 @@ routes = [
         "method": ["GET"],
         "handler": GetFunctionVideoStream,
         "name": "Get Function Recording"
+    },
+    {
+        "route": "/function-recordings/{recording_id}/preview/{kind}",
+        "method": ["GET"],
+        "handler": GetFunctionRecordingPreview,
+        "name": "Get Function Recording Preview"
     }
 ]
 
@@ -0,0 +1,113 @@
+import os
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+POSTER_WIDTH = int(os.getenv("POSTER_WIDTH", "320"))  # Width of the poster thumbnail
+SPRITE_INTERVAL_SECONDS = float(os.getenv("SPRITE_INTERVAL_SECONDS", "5"))  # One sprite tile per this many seconds of video
+SPRITE_TILE_WIDTH = int(os.getenv("SPRITE_TILE_WIDTH", "160"))
+SPRITE_COLUMNS = 10
+SPRITE_MAX_TILES = 1000  # Longer clips get a wider interval instead of a bigger sheet
+PREVIEW_JPEG_QUALITY = 80
+
+# One background thread: previews are not urgent and must not compete with detection for cores
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recording-previews")
+
+
+def preview_paths(video_path):
+    """Poster, sprite sheet and sprite metadata files stored next to a recording"""
+    base, _ = os.path.splitext(video_path)
+    return {"poster": f"{base}.poster.jpg", "sprite": f"{base}.sprite.jpg", "sprite-info": f"{base}.sprite.json"}
+
+
+def _write_atomic(path, data):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def _jpeg(image):
+    import cv2
+
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, PREVIEW_JPEG_QUALITY])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return encoded.tobytes()
+
+
+def generate_previews(video_path):
+    """Write the poster and sprite sheet of a recording; returns the sprite metadata.
+
+    Seeks to one timestamp per tile instead of decoding the whole clip, so
+    the cost is one GOP per tile. The poster is the frame in the middle of the
+    clip, past the pre-roll, where the people who triggered the recording are.
+    """
+    import cv2  # Imported here so API-only workers never load OpenCV
+    import numpy as np
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Unable to open {video_path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 10
+        duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+        interval = max(SPRITE_INTERVAL_SECONDS, duration / SPRITE_MAX_TILES)
+
+        def frame_at(seconds):
+            cap.set(cv2.CAP_PROP_POS_MSEC, seconds * 1000)
+            ret, frame = cap.read()
+            return frame if ret else None
+
+        tiles, tile_size = [], None
+        for index in range(max(1, math.ceil(duration / interval))):
+            frame = frame_at(index * interval)
+            if frame is None:
+                break
+            if tile_size is None:
+                tile_size = (SPRITE_TILE_WIDTH, max(1, round(frame.shape[0] * SPRITE_TILE_WIDTH / frame.shape[1])))
+            tiles.append(cv2.resize(frame, tile_size, interpolation=cv2.INTER_AREA))
+        if not tiles:
+            raise RuntimeError(f"No frames decoded from {video_path}")
+
+        poster = frame_at(duration / 2)
+        if poster is None:
+            poster = frame_at(0)
+    finally:
+        cap.release()
+
+    poster_size = (POSTER_WIDTH, max(1, round(poster.shape[0] * POSTER_WIDTH / poster.shape[1])))
+    columns = min(SPRITE_COLUMNS, len(tiles))
+    rows = math.ceil(len(tiles) / columns)
+    sheet = np.zeros((rows * tile_size[1], columns * tile_size[0], 3), dtype=np.uint8)
+    for index, tile in enumerate(tiles):
+        row, column = divmod(index, columns)
+        sheet[row * tile_size[1]:(row + 1) * tile_size[1], column * tile_size[0]:(column + 1) * tile_size[0]] = tile
+
+    info = {
+        "duration": duration,
+        "interval": interval,
+        "tileWidth": tile_size[0],
+        "tileHeight": tile_size[1],
+        "columns": columns,
+        "rows": rows,
+        "count": len(tiles),
+    }
+    paths = preview_paths(video_path)
+    _write_atomic(paths["poster"], _jpeg(cv2.resize(poster, poster_size, interpolation=cv2.INTER_AREA)))
+    _write_atomic(paths["sprite"], _jpeg(sheet))
+    _write_atomic(paths["sprite-info"], json.dumps(info).encode())
+    return info
+
+
+def _generate_logged(video_path):
+    try:
+        info = generate_previews(video_path)
+        print(f"🖼️ Previews written for {video_path} ({info['count']} tiles)")
+    except Exception as e:
+        print(f"⚠️ Preview generation failed for {video_path}: {str(e)}")
+
+
+def schedule_previews(video_path):
+    """Generate a recording's previews in the background"""
+    return _executor.submit(_generate_logged, video_path)
@@ -3,4 +3,11 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-SECRET_KEY = os.getenv("SECRET_KEY")
\ No newline at end of file
+SECRET_KEY = os.getenv("SECRET_KEY")
+
+# Which part of the service this process runs:
+#   all       - every route; inference models load on first use (default)
+#   api       - CRUD and notification routes only; torch/ultralytics/OpenCV are never imported
+#   inference - every route, plus models preloaded at startup and the scheduled detection functions
+APP_ROLE = os.getenv("APP_ROLE", "all").lower()
+INFERENCE_ROLES = ("all", "inference")